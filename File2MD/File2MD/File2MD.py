@@ -1,18 +1,54 @@
-﻿import sys
-from PySide6.QtWidgets import QApplication
+﻿import time
 
-from main_window import MainWindow
-from config import STYLESHEET_MONO
+PROCESS_START = time.perf_counter()
+
+import sys
 
 # ==============================================================================
 # 5. APPLICATION ENTRY POINT
 # ==============================================================================
 
-if __name__ == "__main__":
+def run_gui(startup_timing=False):
+    from PySide6.QtCore import Qt, QCoreApplication, QTimer
+    from PySide6.QtWidgets import QApplication
+
+    from main_window import MainWindow
+    from config import STYLESHEET_MONO
+
+    # QtWebEngineWidgets is imported lazily, after the application exists,
+    # which Qt only allows when OpenGL contexts are shared up front
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+
     app = QApplication(sys.argv)
     app.setStyleSheet(STYLESHEET_MONO)
 
     window = MainWindow()
     window.show()
 
-    sys.exit(app.exec())
\ No newline at end of file
+    if startup_timing:
+        def report(stage):
+            print(f"startup: {stage} after {time.perf_counter() - PROCESS_START:.3f}s", file=sys.stderr)
+
+        # Runs once the event loop has processed the initial show/paint events
+        QTimer.singleShot(0, lambda: report("window shown"))
+        window.interactive.connect(lambda: (report("interactive"), app.quit()))
+
+    return app.exec()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "convert":
+        # Headless mode: no QApplication, no window
+        from batch import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        from watcher import main
+        sys.exit(main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from server import main
+        sys.exit(main(sys.argv[2:]))
+
+    startup_timing = "--startup-timing" in sys.argv
+    if startup_timing:
+        sys.argv.remove("--startup-timing")
+    sys.exit(run_gui(startup_timing))
\ No newline at end of file
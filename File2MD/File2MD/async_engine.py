@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+import httpx
+import ollama
+
+from config import (
+    MODEL_NAME, SYSTEM_PROMPT, KEEP_ALIVE, CHUNK_MAX_CHARS, ASYNC_MAX_CONCURRENCY,
+    VERIFY_ENABLED, VERIFY_MAX_RETRIES
+)
+from backends import get_backend_pool
+from context_window import request_options
+from converter import ConversionResult, join_chunk_contents, rule_based_result, accept_repair, finish_verification
+from fast_path import plan_units, needs_single_request
+from envelope import EnvelopeParser
+from metrics import StreamTimer
+from verifier import verify
+
+# ==============================================================================
+# 13. ASYNCIO CONVERSION ENGINE (ollama.AsyncClient)
+# ==============================================================================
+
+class AsyncConversionEngine:
+    # Multiplexes many streamed generations on one event loop. The semaphore
+    # bounds how many requests are in flight against the backend; everything
+    # else waits on the loop instead of holding a thread.
+    def __init__(self, max_concurrency=ASYNC_MAX_CONCURRENCY, client=None):
+        self.max_concurrency = max_concurrency
+        # With OLLAMA_HOSTS set, requests are routed through the backend
+        # pool, one client per host; an explicit client bypasses it
+        self.pool = get_backend_pool() if client is None else None
+        self.client = client or ollama.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency)
+        )
+        self._host_clients = {}
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Created lazily so it binds to the loop that actually runs the engine
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _client_for(self, backend):
+        client = self._host_clients.get(backend.host)
+        if client is None:
+            client = self._host_clients[backend.host] = ollama.AsyncClient(
+                host=backend.host,
+                limits=httpx.Limits(max_connections=backend.slots, max_keepalive_connections=backend.slots)
+            )
+        return client
+
+    async def _generate(self, request):
+        if self.pool is None:
+            async for chunk in await self.client.generate(**request):
+                yield chunk
+            return
+        # Same routing as converter._pooled_stream: a host failing before
+        # it streamed anything hands the request to another host
+        tried = []
+        while True:
+            backend = await self.pool.acquire_async(tried)
+            streamed = False
+            try:
+                async for chunk in await self._client_for(backend).generate(**request):
+                    streamed = True
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                self.pool.release(backend)
+                raise
+            except Exception as e:
+                self.pool.release(backend, failed=True, error=e)
+                tried.append(backend)
+                if streamed or not self.pool.has_candidate(tried):
+                    raise
+                continue
+            self.pool.release(backend)
+            return
+
+    async def convert_text(self, text, on_token=None):
+        async with self._get_semaphore():
+            timer = StreamTimer()
+            timer.input_chars = len(text)
+            parser = EnvelopeParser()
+            raw_parts = []
+            body_parts = []
+            token_count = 0
+
+            stream = self._generate(dict(
+                model=MODEL_NAME,
+                prompt=text,
+                system=SYSTEM_PROMPT,
+                options=request_options(text),
+                keep_alive=KEEP_ALIVE,
+                stream=True
+            ))
+            async for chunk in stream:
+                timer.observe(chunk)
+                token = chunk.get('response', '')
+                raw_parts.append(token)
+                body_parts.append(parser.feed(token))
+                token_count += 1
+                if on_token is not None:
+                    on_token(token)
+
+            content, parsed = parser.result("".join(body_parts), "".join(raw_parts))
+            eval_count = timer.server.get('eval_count')
+            return ConversionResult(
+                content, parsed, eval_count or token_count, time.perf_counter() - timer.started_at, metrics=timer
+            )
+
+    async def convert_unit(self, unit, on_token=None):
+        text, markdown = unit
+        if markdown is not None:
+            return rule_based_result(text, markdown)
+        return await self.convert_text(text, on_token)
+
+    async def verify_and_repair(self, text, result):
+        # converter.verify_and_repair on the loop; the word comparison runs
+        # in a thread so other streams keep flowing
+        report = await asyncio.to_thread(verify, text, result.content)
+        for _ in range(VERIFY_MAX_RETRIES):
+            if report.ok or not report.segments:
+                break
+            fixes = await asyncio.gather(
+                *(self._convert_document(segment, None, None) for segment in report.segment_sources())
+            )
+            content = report.repaired([fix.content for fix in fixes])
+            candidate = await asyncio.to_thread(verify, text, content)
+            report = accept_repair(result, report, fixes, content, candidate)
+        return finish_verification(result, report)
+
+    async def convert_document(self, text, on_chunk_ready=None, on_token=None, units=None):
+        # units: pre-planned (text, markdown) units, e.g. from
+        # ConversionMemory.plan; planned from text when None
+        result = await self._convert_document(text, on_chunk_ready, on_token, units)
+        if VERIFY_ENABLED:
+            result = await self.verify_and_repair(text, result)
+        return result
+
+    async def _convert_document(self, text, on_chunk_ready, on_token, units=None):
+        if units is None:
+            units = plan_units(text, CHUNK_MAX_CHARS)
+        if needs_single_request(units):
+            return await self.convert_text(text, on_token)
+
+        timer = StreamTimer()
+        tasks = [asyncio.ensure_future(self.convert_unit(unit, on_token)) for unit in units]
+        results = []
+        try:
+            # Awaited in order so on_chunk_ready sees a contiguous prefix
+            for index, task in enumerate(tasks):
+                results.append(await task)
+                if on_chunk_ready is not None:
+                    on_chunk_ready(index, results[index])
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        for result in results:
+            timer.merge(result.metrics)
+
+        return ConversionResult(
+            join_chunk_contents(result.content for result in results),
+            all(result.parsed for result in results),
+            sum(result.token_count for result in results),
+            time.perf_counter() - timer.started_at,
+            metrics=timer
+        )
+
+    async def convert_many(self, texts):
+        return await asyncio.gather(*(self.convert_document(text) for text in texts), return_exceptions=True)
@@ -0,0 +1,208 @@
+import asyncio
+import threading
+import urllib.request
+
+from config import (
+    OLLAMA_HOSTS, BACKEND_DEFAULT_SLOTS, BACKEND_FAILURE_THRESHOLD, BACKEND_HEALTH_INTERVAL_S,
+    BACKEND_HEALTH_TIMEOUT_S, CHUNK_CONCURRENCY
+)
+
+# ==============================================================================
+# 23. MULTI-HOST OLLAMA BACKENDS (least-outstanding routing, health checks)
+# ==============================================================================
+
+class NoBackendAvailable(ConnectionError):
+    pass
+
+
+class Backend:
+    def __init__(self, host, slots=BACKEND_DEFAULT_SLOTS, weight=None):
+        self.host = host.rstrip("/")
+        self.slots = max(1, slots)
+        self.weight = weight if weight else self.slots
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.completed = 0
+        self.last_error = ""
+
+    @property
+    def load(self):
+        return self.outstanding / self.weight
+
+    def describe(self):
+        state = "up" if self.healthy else f"ejected ({self.last_error})"
+        return f"{self.host}: {state}, {self.outstanding}/{self.slots} busy, {self.completed} done"
+
+
+def parse_hosts(entries):
+    # Entries are URLs or {"host": url, "slots": n, "weight": w} dicts
+    backends = []
+    for entry in entries:
+        if isinstance(entry, str):
+            backends.append(Backend(entry))
+        else:
+            backends.append(Backend(entry["host"], entry.get("slots", BACKEND_DEFAULT_SLOTS), entry.get("weight")))
+    return backends
+
+
+class BackendPool:
+    # Hands each request to the healthy host with the fewest outstanding
+    # requests relative to its weight, never exceeding a host's slots;
+    # callers wait while every slot is busy. A host is ejected after
+    # BACKEND_FAILURE_THRESHOLD consecutive failed requests (or one failed
+    # health check) and re-admitted when a health check succeeds again.
+    def __init__(self, backends, health_interval=BACKEND_HEALTH_INTERVAL_S,
+                 failure_threshold=BACKEND_FAILURE_THRESHOLD, health_timeout=BACKEND_HEALTH_TIMEOUT_S):
+        if not backends:
+            raise ValueError("BackendPool needs at least one backend")
+        self.backends = backends
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.health_timeout = health_timeout
+        self._condition = threading.Condition()
+        self._health_thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def total_slots(self):
+        return sum(backend.slots for backend in self.backends if backend.healthy)
+
+    def _pick(self, exclude):
+        candidates = [
+            backend for backend in self.backends
+            if backend.healthy and backend not in exclude and backend.outstanding < backend.slots
+        ]
+        if not candidates:
+            return None
+        backend = min(candidates, key=lambda backend: (backend.load, backend.outstanding))
+        backend.outstanding += 1
+        return backend
+
+    def has_candidate(self, exclude=()):
+        with self._condition:
+            return self._available(exclude)
+
+    def healthy_backends(self):
+        with self._condition:
+            return [backend for backend in self.backends if backend.healthy]
+
+    def _available(self, exclude):
+        return any(backend.healthy and backend not in exclude for backend in self.backends)
+
+    def try_acquire(self, exclude=()):
+        # Returns a backend, None while all slots are busy, or raises when
+        # no healthy host is left to wait for
+        self._ensure_health_checks()
+        with self._condition:
+            if not self._available(exclude):
+                raise NoBackendAvailable(self._unavailable_message())
+            return self._pick(exclude)
+
+    def acquire(self, exclude=(), cancel=None):
+        self._ensure_health_checks()
+        with self._condition:
+            while True:
+                if cancel is not None:
+                    cancel.check()
+                if not self._available(exclude):
+                    raise NoBackendAvailable(self._unavailable_message())
+                backend = self._pick(exclude)
+                if backend is not None:
+                    return backend
+                # Woken by release(); the timeout re-checks cancellation
+                self._condition.wait(timeout=0.25)
+
+    async def acquire_async(self, exclude=()):
+        while True:
+            backend = self.try_acquire(exclude)
+            if backend is not None:
+                return backend
+            await asyncio.sleep(0.02)
+
+    def release(self, backend, failed=False, error=None):
+        with self._condition:
+            backend.outstanding -= 1
+            if failed:
+                backend.failures += 1
+                backend.last_error = str(error or "request failed")
+                if backend.failures >= self.failure_threshold:
+                    backend.healthy = False
+            else:
+                backend.failures = 0
+                backend.completed += 1
+            self._condition.notify_all()
+
+    def _unavailable_message(self):
+        return "No healthy Ollama host available:\n" + "\n".join(backend.describe() for backend in self.backends)
+
+    # --- Health checks ---
+
+    def probe(self, backend):
+        try:
+            with urllib.request.urlopen(f"{backend.host}/api/version", timeout=self.health_timeout) as response:
+                return response.status == 200, ""
+        except Exception as e:
+            return False, str(e)
+
+    def check_health(self):
+        for backend in self.backends:
+            ok, error = self.probe(backend)
+            with self._condition:
+                if ok:
+                    backend.healthy = True
+                    backend.failures = 0
+                else:
+                    backend.healthy = False
+                    backend.last_error = error
+                self._condition.notify_all()
+
+    def _ensure_health_checks(self):
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        with self._condition:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, name="backend-health", daemon=True)
+                self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            self.check_health()
+
+    def stop(self):
+        self._stopped.set()
+
+    def describe(self):
+        with self._condition:
+            return "\n".join(backend.describe() for backend in self.backends)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_backend_pool():
+    # None when OLLAMA_HOSTS is empty: requests then use ollama's default
+    # client (localhost or the OLLAMA_HOST environment variable)
+    global _pool
+    with _pool_lock:
+        if _pool is None and OLLAMA_HOSTS:
+            _pool = BackendPool(parse_hosts(OLLAMA_HOSTS))
+        return _pool
+
+
+def set_backend_pool(pool):
+    # Replaces the configured pool, e.g. with stand-in servers in benchmarks
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop()
+        _pool = pool
+
+
+def chunk_concurrency():
+    # Chunks of one document in flight: enough to fill every healthy slot
+    pool = get_backend_pool()
+    if pool is None:
+        return CHUNK_CONCURRENCY
+    return max(CHUNK_CONCURRENCY, pool.total_slots)
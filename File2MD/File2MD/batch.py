@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config import BATCH_EXTENSIONS, BATCH_DEFAULT_JOBS
+from converter import convert_document, describe_error, ConversionResult, CancelToken, ConversionCancelled
+from cache import get_cache
+from metrics import append_record, format_summary
+from progress import ProgressTracker, estimate_output_tokens, format_eta
+from async_engine import AsyncConversionEngine
+from file_loader import read_text
+
+# ==============================================================================
+# 7. HEADLESS BATCH CONVERSION (python -m File2MD convert ...)
+# ==============================================================================
+
+def _glob_base(pattern):
+    # Directory part of the pattern before the first wildcard, used to keep
+    # the relative layout of matched files in the output directory
+    magic_index = min((pattern.find(c) for c in "*?[" if c in pattern), default=len(pattern))
+    return os.path.dirname(pattern[:magic_index]) or "."
+
+
+def collect_inputs(patterns, extensions=BATCH_EXTENSIONS):
+    inputs = []
+    seen = set()
+
+    def add(path, relative_name):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            inputs.append((path, relative_name))
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _dirs, files in os.walk(pattern):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        path = os.path.join(root, name)
+                        add(path, os.path.relpath(path, pattern))
+        elif os.path.isfile(pattern):
+            add(pattern, os.path.basename(pattern))
+        else:
+            base = _glob_base(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    add(path, os.path.relpath(path, base))
+    return inputs
+
+
+def output_path_for(relative_name, output_dir):
+    stem, _ext = os.path.splitext(relative_name)
+    return os.path.join(output_dir, stem + ".md")
+
+
+def read_input(source_path):
+    return read_text(source_path)[0]
+
+
+def write_output(output_path, content):
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+
+def convert_file(source_path, output_path, cache=None, on_token=None, cancel=None):
+    started = time.perf_counter()
+    text = read_input(source_path)
+
+    cached = cache.get(text) if cache is not None else None
+    if cached is not None:
+        result = ConversionResult(cached, True, 0, time.perf_counter() - started, cached=True)
+    else:
+        result = convert_document(text, on_token=on_token, cancel=cancel)
+        if cache is not None and result.cacheable:
+            cache.put(text, result.content)
+
+    write_output(output_path, result.content)
+    return result
+
+
+async def convert_file_async(engine, source_path, output_path, cache=None, on_token=None):
+    started = time.perf_counter()
+    text = await asyncio.to_thread(read_input, source_path)
+
+    cached = cache.get(text) if cache is not None else None
+    if cached is not None:
+        result = ConversionResult(cached, True, 0, time.perf_counter() - started, cached=True)
+    else:
+        result = await engine.convert_document(text, on_token=on_token)
+        if cache is not None and result.cacheable:
+            await asyncio.to_thread(cache.put, text, result.content)
+
+    await asyncio.to_thread(write_output, output_path, result.content)
+    return result
+
+
+class BatchSummary:
+    def __init__(self):
+        self.cache = None
+        # Output tokens expected across all documents, from their file sizes
+        self.progress = ProgressTracker()
+        self.estimates = {}
+        self.converted = 0
+        self.failures = []
+        self.cancelled = 0
+        self.interrupted = False
+        self.tokens = 0
+        self.elapsed = 0.0
+
+    def plan(self, inputs):
+        for source, _ in inputs:
+            try:
+                size = os.path.getsize(source)
+            except OSError:
+                size = 0
+            self.estimates[source] = estimate_output_tokens(size)
+            self.progress.add_expected(self.estimates[source])
+
+    def count_token(self, token):
+        # Called from every in-flight document
+        if token:
+            self.progress.add()
+
+    def progress_label(self, done_count):
+        percent, eta = self.progress.snapshot()
+        if done_count == len(self.estimates):
+            percent, eta = 100, None
+        eta_note = format_eta(eta)
+        return f"{done_count}/{len(self.estimates)} {percent}%" + (f" {eta_note}" if eta_note else "")
+
+    def report(self, stream=sys.stdout):
+        total = self.converted + len(self.failures) + self.cancelled
+        elapsed = max(self.elapsed, 1e-9)
+        print(
+            f"Converted {self.converted}/{total} documents in {self.elapsed:.1f}s | "
+            f"{self.converted / elapsed:.2f} docs/s | "
+            f"{self.tokens / elapsed:.1f} tokens/s | "
+            f"{len(self.failures)} failures",
+            file=stream
+        )
+        if self.interrupted or self.cancelled:
+            skipped = len(self.estimates) - self.converted - len(self.failures)
+            print(f"Cancelled; {skipped} documents not converted", file=stream)
+        if self.cache is not None:
+            print(f"Conversion {self.cache.describe()}", file=stream)
+
+
+def _record(summary, done_count, source, result=None, error=None, log=sys.stderr):
+    summary.progress.complete(summary.estimates[source], result.token_count if result is not None else 0)
+    label = summary.progress_label(done_count)
+    if isinstance(error, (ConversionCancelled, asyncio.CancelledError)):
+        summary.cancelled += 1
+        print(f"[{label}] CANCELLED {source}", file=log)
+        return
+    if error is not None:
+        summary.failures.append((source, describe_error(error)))
+        print(f"[{label}] FAILED {source}: {error}", file=log)
+        return
+
+    summary.converted += 1
+    summary.tokens += result.token_count
+    if result.cached:
+        note = " (cache hit)"
+    elif not result.parsed:
+        note = " (parsing tags failed, raw output kept)"
+    else:
+        note = ""
+    if result.metrics is not None:
+        record = result.metrics.record(
+            mode="batch", source=str(source), output_chars=len(result.content), parsed=result.parsed
+        )
+        append_record(record)
+        note += f" | {format_summary(record)}"
+    print(f"[{label}] {source} ({result.elapsed:.1f}s){note}", file=log)
+
+
+def run_batch(inputs, output_dir, jobs=BATCH_DEFAULT_JOBS, use_cache=True, engine="thread", log=sys.stderr,
+              cancel=None):
+    # cancel (a CancelToken) lets another thread stop the run; Ctrl+C does
+    # the same. Documents already written are kept.
+    cancel = cancel or CancelToken()
+    summary = BatchSummary()
+    summary.cache = get_cache() if use_cache else None
+    started = time.perf_counter()
+    summary.plan(inputs)
+
+    if engine == "async":
+        try:
+            asyncio.run(_run_batch_async(inputs, output_dir, jobs, summary, log, cancel))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            summary.interrupted = True
+        summary.elapsed = time.perf_counter() - started
+        return summary
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {
+            pool.submit(
+                convert_file, source, output_path_for(relative, output_dir), summary.cache,
+                summary.count_token, cancel
+            ): source
+            for source, relative in inputs
+        }
+        try:
+            for done_count, future in enumerate(as_completed(futures), start=1):
+                try:
+                    _record(summary, done_count, futures[future], result=future.result(), log=log)
+                except Exception as e:
+                    _record(summary, done_count, futures[future], error=e, log=log)
+        except KeyboardInterrupt:
+            # Closing the streams lets the running documents return at once
+            summary.interrupted = True
+            cancel.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+
+async def _run_batch_async(inputs, output_dir, jobs, summary, log, cancel):
+    # One event loop for every document; the engine's semaphore keeps at
+    # most `jobs` requests in flight against the backend.
+    engine = AsyncConversionEngine(max_concurrency=max(1, jobs))
+    loop = asyncio.get_running_loop()
+    main_task = asyncio.current_task()
+    # Cancelling the task cancels every request in flight
+    cancel.register(lambda: loop.call_soon_threadsafe(main_task.cancel))
+
+    async def convert_one(source, relative):
+        try:
+            output_path = output_path_for(relative, output_dir)
+            return source, await convert_file_async(engine, source, output_path, summary.cache, summary.count_token), None
+        except Exception as e:
+            return source, None, e
+
+    pending = [convert_one(source, relative) for source, relative in inputs]
+    for done_count, next_done in enumerate(asyncio.as_completed(pending), start=1):
+        source, result, error = await next_done
+        _record(summary, done_count, source, result, error, log)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="File2MD convert", description="Convert text files to markdown without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="Files, directories or glob patterns to convert")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory that receives one .md per input")
+    parser.add_argument("-j", "--jobs", type=int, default=BATCH_DEFAULT_JOBS, help="Documents converted concurrently")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the conversion cache")
+    parser.add_argument(
+        "--engine", choices=("thread", "async"), default="thread",
+        help="Thread pool with the blocking client, or one asyncio loop with ollama.AsyncClient"
+    )
+    args = parser.parse_args(argv)
+
+    inputs = collect_inputs(args.inputs)
+    if not inputs:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    summary = run_batch(inputs, args.output_dir, args.jobs, use_cache=not args.no_cache, engine=args.engine)
+    summary.report()
+    if summary.interrupted:
+        return 130
+    return 1 if summary.failures else 0
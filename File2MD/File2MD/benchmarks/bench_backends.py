@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ollama import FakeOllamaServer
+from bench_end_to_end import make_input
+from backends import Backend, BackendPool, set_backend_pool
+from converter import convert_document
+
+# ==============================================================================
+# BENCHMARK: one document spread over several Ollama hosts, with failover
+# ==============================================================================
+
+# Each stand-in server listens on its own port. The document is converted
+# on one host, then on all of them; finally one host starts failing midway
+# and must be ejected, with its requests retried elsewhere, then
+# re-admitted by the health checks once it recovers.
+
+
+def make_pool(servers, slots, health_interval):
+    backends = [Backend(server.url, slots) for server in servers]
+    pool = BackendPool(backends, health_interval=health_interval, failure_threshold=1)
+    set_backend_pool(pool)
+    return pool
+
+
+def timed_conversion(text):
+    started = time.perf_counter()
+    result = convert_document(text)
+    return time.perf_counter() - started, result
+
+
+def requests_by_host(servers):
+    return ", ".join(f"{server.url.rsplit(':', 1)[1]}={server.requests}" for server in servers)
+
+
+def reset(servers):
+    for server in servers:
+        server.reset_counters()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-host routing benchmark against stand-in Ollama servers.")
+    parser.add_argument("--hosts", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=2, help="Concurrent requests per host")
+    parser.add_argument("--size-kb", type=int, default=200)
+    parser.add_argument("--token-rate", type=float, default=4000.0, help="Streamed pieces per second per request")
+    args = parser.parse_args(argv)
+
+    servers = [FakeOllamaServer(token_rate=args.token_rate).start() for _ in range(max(2, args.hosts))]
+    text = make_input(args.size_kb * 1024)
+    try:
+        make_pool(servers[:1], args.slots, health_interval=0)
+        single_seconds, _ = timed_conversion(text)
+        print(f"1 host:  {single_seconds:7.2f} s  ({requests_by_host(servers[:1])})")
+
+        reset(servers)
+        pool = make_pool(servers, args.slots, health_interval=0.2)
+        spread_seconds, result = timed_conversion(text)
+        print(f"{len(servers)} hosts: {spread_seconds:7.2f} s  ({requests_by_host(servers)}), "
+              f"{single_seconds / spread_seconds:.1f}x, output {'matches' if result.parsed else 'broken'}")
+
+        # Failover: the first host fails a moment into the conversion
+        reset(servers)
+        failing = servers[0]
+        threading.Timer(spread_seconds / 4, lambda: setattr(failing, "failing", True)).start()
+        failover_seconds, result = timed_conversion(text)
+        ejected = not pool.backends[0].healthy
+        print(f"failover: {failover_seconds:6.2f} s  ({requests_by_host(servers)}), "
+              f"host {'ejected' if ejected else 'NOT ejected'}, "
+              f"words {'all preserved' if result.verification is None or result.verification.ok else 'lost'}")
+
+        failing.failing = False
+        deadline = time.perf_counter() + 5
+        while not pool.backends[0].healthy and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        reset(servers)
+        timed_conversion(text)
+        print(f"recovery: host {'re-admitted' if pool.backends[0].healthy else 'still ejected'} "
+              f"({requests_by_host(servers)})")
+    finally:
+        set_backend_pool(None)
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ollama import FakeOllamaServer
+
+# ==============================================================================
+# END-TO-END BENCHMARK: ConversionWorker and the GUI render path
+# ==============================================================================
+
+SIZES = {
+    "1KB": 1024,
+    "10KB": 10 * 1024,
+    "100KB": 100 * 1024,
+    "1MB": 1024 * 1024,
+    "10MB": 10 * 1024 * 1024,
+}
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog while streaming tokens arrive "
+    "from a local model and the window renders markdown blocks incrementally"
+).split()
+
+
+def make_input(size):
+    # Paragraphs of 40-80 words, separated by blank lines
+    parts = []
+    total = 0
+    index = 0
+    while total < size:
+        count = 40 + index % 41
+        paragraph = " ".join(WORDS[(index + i) % len(WORDS)] for i in range(count))
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+        index += 1
+    return "\n\n".join(parts)[:size]
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_worker(text, server):
+    from worker import ConversionWorker
+
+    worker = ConversionWorker(text)
+    stats = {"ttft_s": None, "signals": 0, "chars": 0, "error": None}
+
+    def on_token(token):
+        stats["signals"] += 1
+        stats["chars"] += len(token)
+
+    worker.first_token.connect(lambda seconds: stats.__setitem__("ttft_s", seconds))
+    worker.new_token.connect(on_token)
+    worker.error.connect(lambda message: stats.__setitem__("error", message))
+
+    server.reset_counters()
+    started = time.perf_counter()
+    # Runs synchronously; without a receiving thread the signals are direct calls
+    worker.run()
+    elapsed = time.perf_counter() - started
+
+    stats.update(
+        elapsed_s=elapsed,
+        tokens=server.tokens_sent,
+        tokens_per_s=server.tokens_sent / elapsed if elapsed else 0.0,
+        peak_rss_mb=peak_rss_mb(),
+    )
+    return stats
+
+
+class SlotTimer:
+    # Wraps GUI-thread slots to measure busy time; nested calls (a slot that
+    # calls another wrapped slot) are only counted once.
+    def __init__(self):
+        self.busy = 0.0
+        self.depth = 0
+        self.calls = {}
+
+    def wrap(self, name, method):
+        def timed(*args):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.depth += 1
+            started = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.busy += time.perf_counter() - started
+        return timed
+
+
+def bench_gui(text, server, app, window, view):
+    from PySide6.QtCore import QEventLoop
+
+    if view == "raw" and window.render_mode:
+        window.toggle_view_mode()
+    elif view == "rendered" and not window.render_mode:
+        window.toggle_view_mode()
+
+    window.clear_all()
+    window.input_text.setPlainText(text)
+    app.processEvents()
+
+    timer = SlotTimer()
+    for name in ("append_token", "_on_stream_render_tick", "_append_output_display",
+                 "update_progress", "on_conversion_finished"):
+        setattr(window, name, timer.wrap(name, getattr(type(window), name).__get__(window)))
+    window.stream_render_timer.timeout.disconnect()
+    window.stream_render_timer.timeout.connect(window._on_stream_render_tick)
+
+    server.reset_counters()
+    started = time.perf_counter()
+    window.start_conversion_process()
+    while not window.convert_button.isEnabled():
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+    elapsed = time.perf_counter() - started
+
+    for name in list(timer.calls):
+        delattr(window, name)
+    window.stream_render_timer.timeout.disconnect()
+    window.stream_render_timer.timeout.connect(window._on_stream_render_tick)
+
+    updates = timer.calls.get("_append_output_display", 0)
+    return {
+        "view": view,
+        "ttft_s": window.conversion_ttft,
+        "elapsed_s": elapsed,
+        "tokens": server.tokens_sent,
+        "tokens_per_s": server.tokens_sent / elapsed if elapsed else 0.0,
+        "token_signals": timer.calls.get("append_token", 0),
+        "render_updates": updates,
+        "render_updates_per_s": updates / elapsed if elapsed else 0.0,
+        "gui_busy_s": timer.busy,
+        "gui_busy_fraction": timer.busy / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def start_gui(view):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtCore import Qt, QCoreApplication, QEventLoop
+    from PySide6.QtWidgets import QApplication
+    from main_window import MainWindow
+
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication.instance() or QApplication([])
+    window = MainWindow()
+    window.show()
+    if view == "rendered":
+        window._ensure_web_view()
+        deadline = time.perf_counter() + 30
+        while not window.preview_ready and time.perf_counter() < deadline:
+            app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+    return app, window
+
+
+def print_table(results):
+    print(f"\n{'size':>6} {'path':>8} {'ttft s':>8} {'tok/s':>10} {'upd/s':>8} {'gui busy':>9} {'rss MB':>8}")
+    for row in results:
+        ttft = f"{row['ttft_s']:.3f}" if row.get("ttft_s") is not None else "-"
+        updates = f"{row['render_updates_per_s']:.1f}" if "render_updates_per_s" in row else "-"
+        busy = f"{row['gui_busy_fraction'] * 100:.1f}%" if "gui_busy_fraction" in row else "-"
+        rss = f"{row['peak_rss_mb']:.0f}" if row.get("peak_rss_mb") is not None else "-"
+        print(f"{row['size']:>6} {row['path']:>8} {ttft:>8} {row['tokens_per_s']:>10.1f} {updates:>8} {busy:>9} {rss:>8}")
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(row["size"], row["path"]): row for row in json.load(f)["results"]}
+    print(f"\nChange vs {baseline_path}:")
+    for row in results:
+        old = baseline.get((row["size"], row["path"]))
+        if not old:
+            continue
+        for key in ("ttft_s", "tokens_per_s", "gui_busy_s"):
+            if row.get(key) and old.get(key):
+                print(f"  {row['size']:>6} {row['path']:>8} {key:<14} {(row[key] / old[key] - 1) * 100:+.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end File2MD benchmark against a fake Ollama server.")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma-separated subset of {', '.join(SIZES)}")
+    parser.add_argument("--paths", default="worker,gui", help="worker, gui or both")
+    parser.add_argument("--view", choices=("rendered", "raw"), default="rendered", help="Output pane used by the GUI path")
+    parser.add_argument("--token-rate", type=float, default=5000.0, help="Fake server pieces per second per request")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server seconds before the first piece")
+    parser.add_argument("--chunk-chars", type=int, default=8, help="Fake server characters per piece")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="Machine-readable results file")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    server = FakeOllamaServer(token_rate=args.token_rate, latency=args.latency, chunk_chars=args.chunk_chars).start()
+    os.environ["OLLAMA_HOST"] = server.url
+
+    # Configure the app before any of its modules read these values
+    import config
+    config.CACHE_ENABLED = False
+    config.WARMUP_ON_START = False
+    config.KEEPALIVE_PING_INTERVAL_MS = 0
+
+    paths = args.paths.split(",")
+    app = window = None
+    if "gui" in paths:
+        app, window = start_gui(args.view)
+
+    results = []
+    try:
+        for size_name in args.sizes.split(","):
+            text = make_input(SIZES[size_name])
+            if "worker" in paths:
+                results.append({"size": size_name, "path": "worker", **bench_worker(text, server)})
+            if "gui" in paths:
+                results.append({"size": size_name, "path": "gui", **bench_gui(text, server, app, window, args.view)})
+    finally:
+        server.stop()
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server": {"token_rate": args.token_rate, "latency": args.latency, "chunk_chars": args.chunk_chars},
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results)
+    print(f"\nResults written to {args.output}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from envelope import EnvelopeParser, START_TAG
+from text_buffer import TextBuffer
+
+# ==============================================================================
+# MICROBENCHMARK: per-token append cost as the output grows
+# ==============================================================================
+
+TOKEN = "word "
+CHECKPOINT_TOKENS = 50_000
+TARGET_BYTES = 8 * 1024 * 1024
+
+# The quadratic baseline is stopped early; its trend is clear long before 8 MB
+BASELINE_BYTES = 512 * 1024
+BASELINE_CHECKPOINT_TOKENS = 10_000
+
+
+class StringHolder:
+    # Mirrors the old `self.markdown_buffer += token` pattern on an attribute,
+    # which CPython cannot resize in place and therefore copies every time.
+    def __init__(self):
+        self.buffer = ""
+
+    def append(self, token):
+        self.buffer += token
+
+
+def run(name, buffer, target_bytes=TARGET_BYTES, checkpoint=CHECKPOINT_TOKENS, report_every=8):
+    print(f"\n{name}")
+    print(f"{'output size':>14} {'ns/token':>10}")
+    total_tokens = target_bytes // len(TOKEN)
+    written = 0
+    # Each token is kept raw and fed to the envelope parser, as the GUI does
+    envelope = EnvelopeParser()
+    envelope.feed(START_TAG)
+    pending = TextBuffer()
+    while written < total_tokens:
+        started = time.perf_counter()
+        for _ in range(checkpoint):
+            buffer.append(TOKEN)
+            pending.append(envelope.feed(TOKEN))
+        elapsed = time.perf_counter() - started
+        # Drained on every render tick
+        pending.clear()
+        written += checkpoint
+        if written % (checkpoint * report_every) == 0 or written >= total_tokens:
+            size = written * len(TOKEN)
+            print(f"{size / 1024 / 1024:>11.2f} MB {elapsed / checkpoint * 1e9:>10.0f}")
+
+
+if __name__ == "__main__":
+    run("TextBuffer.append", TextBuffer())
+    run("str += on an attribute", StringHolder(), BASELINE_BYTES, BASELINE_CHECKPOINT_TOKENS, report_every=2)
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from verifier import verify
+
+# ==============================================================================
+# MICROBENCHMARK: content verification time as documents grow
+# ==============================================================================
+
+VOCABULARY = [f"word{i}" for i in range(5000)] + ["naïve", "“quoted”", "don’t", "–"]
+SIZES_MB = (0.5, 1, 2, 4, 8)
+
+
+def make_document(target_bytes, rng):
+    paragraphs = []
+    size = 0
+    while size < target_bytes:
+        paragraph = " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(20, 120)))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return paragraphs
+
+
+def damage(paragraphs, rng):
+    # A few typical model failures: a truncated paragraph, an invented
+    # sentence and a paragraph left out entirely
+    damaged = list(paragraphs)
+    for _ in range(3):
+        index = rng.randrange(len(damaged))
+        damaged[index] = " ".join(damaged[index].split()[:-5])
+    damaged.insert(rng.randrange(len(damaged)), "an invented sentence the input never had")
+    del damaged[rng.randrange(len(damaged))]
+    return damaged
+
+
+def timed(source, output):
+    started = time.perf_counter()
+    report = verify(source, output)
+    return time.perf_counter() - started, report
+
+
+if __name__ == "__main__":
+    rng = random.Random(0)
+    print(f"{'input':>8} {'words':>10} {'match s':>9} {'mismatch s':>11} {'segments':>9}")
+    for size_mb in SIZES_MB:
+        paragraphs = make_document(int(size_mb * 1024 * 1024), rng)
+        source = "\n\n".join(paragraphs)
+        markdown = "\n\n".join(f"- {paragraph}" for paragraph in paragraphs)
+        match_seconds, report = timed(source, markdown)
+        mismatch_seconds, failing = timed(source, "\n\n".join(damage(paragraphs, rng)))
+        print(f"{size_mb:>5.1f} MB {report.word_count:>10,} {match_seconds:>9.3f} "
+              f"{mismatch_seconds:>11.3f} {len(failing.segments):>9}")
@@ -0,0 +1,214 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ==============================================================================
+# FAKE OLLAMA SERVER: /api/generate streaming protocol for benchmarks
+# ==============================================================================
+
+# The model "converts" by echoing the prompt inside a <markdown> envelope,
+# streamed in fixed-size pieces at a fixed rate. Only the parts of the API
+# File2MD uses are implemented.
+
+
+class FakeOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, token_rate=500.0, latency=0.05,
+                 chunk_chars=4, load_delay=0.0):
+        self.token_rate = token_rate
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.load_delay = load_delay
+        self.tokens_sent = 0
+        self.requests = 0
+        self._loaded = load_delay <= 0
+        # While set, generate requests get a 500 and health probes a 503
+        self.failing = False
+        self._lock = threading.Lock()
+
+        handler = type("Handler", (_FakeOllamaHandler,), {"server_state": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.tokens_sent = 0
+            self.requests = 0
+
+    def _count(self, tokens=0, requests=0):
+        with self._lock:
+            self.tokens_sent += tokens
+            self.requests += requests
+
+    def _load_model(self):
+        # Simulates a cold model: the first request pays load_delay once
+        with self._lock:
+            if self._loaded:
+                return 0.0
+            self._loaded = True
+        time.sleep(self.load_delay)
+        return self.load_delay
+
+
+class _FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if self.server_state.failing:
+            self._send_json({"error": "unavailable"}, status=503)
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": "fake", "model": "fake"}]})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/api/generate":
+            self._send_json({"error": f"unsupported endpoint {self.path}"}, status=404)
+            return
+
+        state = self.server_state
+        if state.failing:
+            self._send_json({"error": "fake server failure"}, status=500)
+            return
+        state._count(requests=1)
+        started = time.perf_counter_ns()
+        load_seconds = state._load_model()
+        model = request.get("model", "fake")
+        prompt = request.get("prompt", "")
+
+        final = {
+            "model": model,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": "",
+            "done": True,
+            "done_reason": "stop",
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int(state.latency * 1e9),
+        }
+
+        if not prompt:
+            # Warm-up / keep-alive ping
+            final.update(eval_count=0, eval_duration=0, total_duration=time.perf_counter_ns() - started)
+            self._send_json(final)
+            return
+
+        output = f"<markdown>\n{prompt}\n</markdown>"
+        pieces = [output[i:i + state.chunk_chars] for i in range(0, len(output), state.chunk_chars)]
+        time.sleep(state.latency)
+        eval_started = time.perf_counter_ns()
+
+        if not request.get("stream", True):
+            time.sleep(len(pieces) / state.token_rate)
+            state._count(tokens=len(pieces))
+            final.update(response=output, eval_count=len(pieces),
+                         eval_duration=time.perf_counter_ns() - eval_started,
+                         total_duration=time.perf_counter_ns() - started)
+            self._send_json(final)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        interval = 1.0 / state.token_rate
+        next_send = time.perf_counter()
+        try:
+            for piece in pieces:
+                # Sleep only when ahead of schedule so high rates stay accurate
+                next_send += interval
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write_chunk({"model": model, "created_at": final["created_at"], "response": piece, "done": False})
+                state._count(tokens=1)
+
+            final.update(eval_count=len(pieces), eval_duration=time.perf_counter_ns() - eval_started,
+                         total_duration=time.perf_counter_ns() - started)
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled; a real server stops generating here too
+            self.close_connection = True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server for File2MD benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--count", type=int, default=1, help="Servers to start, on consecutive ports")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="Streamed pieces per second per request")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first piece (prompt eval)")
+    parser.add_argument("--chunk-chars", type=int, default=4, help="Characters per streamed piece")
+    parser.add_argument("--load-delay", type=float, default=0.0, help="One-off cold model load time in seconds")
+    args = parser.parse_args(argv)
+
+    servers = [
+        FakeOllamaServer(args.host, args.port + i, args.token_rate, args.latency, args.chunk_chars, args.load_delay)
+        for i in range(max(1, args.count))
+    ]
+    if len(servers) == 1:
+        print(f"Fake Ollama listening on {servers[0].url} (set OLLAMA_HOST={servers[0].url})")
+    else:
+        print(f"Fake Ollama listening on {', '.join(server.url for server in servers)}")
+        print("Set OLLAMA_HOSTS = (" + ", ".join(f'"{server.url}"' for server in servers) + ",) in config.py")
+    for server in servers[1:]:
+        server.start()
+    try:
+        servers[0].httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for server in servers:
+            server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from config import (
+    MODEL_NAME, SYSTEM_PROMPT, GENERATION_OPTIONS,
+    CACHE_ENABLED, CACHE_DIR, CACHE_MAX_BYTES,
+    CHUNK_MAX_CHARS, FAST_PATH_ENABLED, FAST_PATH_MIN_SPLIT_CHARS, VERIFY_ENABLED, VERIFY_MAX_RETRIES,
+    VERIFY_LOOKAHEAD_WORDS, CONTEXT_SHAPING_ENABLED, CONTEXT_MIN_TOKENS, CONTEXT_MAX_TOKENS,
+    NUM_PREDICT_RATIO, NUM_PREDICT_HEADROOM, PROGRESS_CHARS_PER_TOKEN, PROGRESS_OUTPUT_RATIO
+)
+
+# ==============================================================================
+# 9. CONTENT-ADDRESSED CONVERSION CACHE
+# ==============================================================================
+
+CACHE_SUFFIX = ".md.z"
+
+
+# Settings besides the model, prompt and options that change the output:
+# how the input is split, what skips the model, what is re-requested and
+# the num_ctx / num_predict each request is sent with
+OUTPUT_SETTINGS = {
+    "chunk_max_chars": CHUNK_MAX_CHARS,
+    "fast_path": [FAST_PATH_ENABLED, FAST_PATH_MIN_SPLIT_CHARS],
+    "verify": [VERIFY_ENABLED, VERIFY_MAX_RETRIES, VERIFY_LOOKAHEAD_WORDS],
+    "context": [
+        CONTEXT_SHAPING_ENABLED, CONTEXT_MIN_TOKENS, CONTEXT_MAX_TOKENS, NUM_PREDICT_RATIO,
+        NUM_PREDICT_HEADROOM, PROGRESS_CHARS_PER_TOKEN, PROGRESS_OUTPUT_RATIO
+    ],
+}
+
+
+def make_cache_key(text, model=MODEL_NAME, system=SYSTEM_PROMPT, options=GENERATION_OPTIONS,
+                   settings=OUTPUT_SETTINGS):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([model, system, options, settings], sort_keys=True).encode('utf-8'))
+    digest.update(b"\0")
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    # Parsed markdown stored zlib-compressed, one file per key. File mtimes
+    # carry the LRU order across runs; an in-memory index mirrors it.
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def _load_index(self):
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-len(CACHE_SUFFIX)], stat.st_size))
+        for _mtime, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def get(self, text):
+        key = make_cache_key(text)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    content = zlib.decompress(f.read()).decode('utf-8')
+                os.utime(self._path(key))
+            except (OSError, zlib.error, UnicodeDecodeError):
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def put(self, text, content):
+        key = make_cache_key(text)
+        data = zlib.compress(content.encode('utf-8'), 6)
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            temp_path = self._path(key) + ".tmp"
+            try:
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, self._path(key))
+            except OSError:
+                return
+
+            self._total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+
+            while self._total_bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._forget(oldest)
+                self.evictions += 1
+
+    def _forget(self, key):
+        self._total_bytes -= self._entries.pop(key, 0)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
+
+    def describe(self):
+        stats = self.stats()
+        return f"cache hits {stats['hits']} / misses {stats['misses']} / evictions {stats['evictions']}"
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = ConversionCache()
+            except OSError:
+                return None
+        return _default_cache
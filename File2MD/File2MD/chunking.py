@@ -0,0 +1,143 @@
+import itertools
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CHUNK_MAX_CHARS, CHUNK_CONCURRENCY
+from context_window import fits_context, fitting_chars
+
+# ==============================================================================
+# 8. PARAGRAPH-ALIGNED CHUNKING FOR LARGE INPUTS
+# ==============================================================================
+
+HEADING_PATTERN = re.compile(r"^(#{1,6}\s|\S.*\n(=+|-+)\s*$)")
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+
+
+def split_paragraphs(text):
+    # Paragraphs are separated by blank lines; a '#' heading always starts a
+    # new paragraph and fenced code blocks are never split.
+    paragraphs = []
+    current = []
+    in_fence = False
+
+    for line in text.splitlines():
+        if FENCE_PATTERN.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            if not line.strip():
+                if current:
+                    paragraphs.append("\n".join(current))
+                    current = []
+                continue
+            if line.startswith("#") and current:
+                paragraphs.append("\n".join(current))
+                current = []
+        current.append(line)
+
+    if current:
+        paragraphs.append("\n".join(current))
+    return paragraphs
+
+
+def _split_oversized(paragraph, max_chars):
+    pieces = []
+    current = ""
+    for line in paragraph.split("\n"):
+        while len(line) > max_chars:
+            # Last resort for a single huge line: break on whitespace
+            cut = line.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:cut])
+            line = line[cut:].lstrip()
+        if current and len(current) + 1 + len(line) > max_chars:
+            pieces.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text, max_chars=CHUNK_MAX_CHARS):
+    chunks = []
+    current = []
+    current_len = 0
+
+    for paragraph in split_paragraphs(text):
+        for piece in (_split_oversized(paragraph, max_chars) if len(paragraph) > max_chars else [paragraph]):
+            added_len = len(piece) + (2 if current else 0)
+            # Prefer to break before a heading once the chunk is reasonably full
+            heading_break = current_len >= max_chars // 2 and HEADING_PATTERN.match(piece)
+            if current and (current_len + added_len > max_chars or heading_break):
+                chunks.append("\n\n".join(current))
+                current = []
+                current_len = 0
+                added_len = len(piece)
+            current.append(piece)
+            current_len += added_len
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return [piece for chunk in chunks for piece in _fit_context(chunk)]
+
+
+def _fit_context(chunk):
+    # max_chars assumes mostly single-byte text; a chunk whose estimated
+    # tokens would overflow the context window is split again
+    if fits_context(chunk):
+        return [chunk]
+    limit = min(fitting_chars(chunk), len(chunk) - 1)
+    if limit <= 0:
+        # Cannot be made to fit; refused with RequestTooLarge when sent
+        return [chunk]
+    return split_into_chunks(chunk, limit)
+
+
+def convert_chunks(chunks, convert_fn, max_workers=CHUNK_CONCURRENCY, on_ready=None):
+    # Runs convert_fn over the chunks on a bounded pool. on_ready(index, result)
+    # is called from the calling thread, strictly in chunk order, as soon as
+    # every earlier chunk has finished.
+    results = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = [pool.submit(convert_fn, chunk) for chunk in chunks]
+        try:
+            for index, future in enumerate(futures):
+                results[index] = future.result()
+                if on_ready is not None:
+                    on_ready(index, results[index])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return results
+
+
+def convert_chunk_stream(chunks, convert_fn, max_workers=CHUNK_CONCURRENCY, on_ready=None):
+    # convert_chunks for an iterator of unknown length (a mapped file): at
+    # most 2 * max_workers chunks are read ahead and results are not kept,
+    # so the input never has to be in memory as a whole. Returns the count.
+    max_workers = max(1, max_workers)
+    chunks = iter(chunks)
+    window = deque()
+    count = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        try:
+            while True:
+                for chunk in itertools.islice(chunks, 2 * max_workers - len(window)):
+                    window.append(pool.submit(convert_fn, chunk))
+                if not window:
+                    return count
+                result = window.popleft().result()
+                if on_ready is not None:
+                    on_ready(count, result)
+                count += 1
+        except BaseException:
+            for future in window:
+                future.cancel()
+            raise
@@ -1,9 +1,17 @@
+import os
+
 # ==============================================================================
 # 1. APPLICATION CONFIGURATION
 # ==============================================================================
 
 MODEL_NAME = "granite4:tiny-h"
 
+# Extra Ollama generation options (temperature, top_p, ...). Part of the
+# conversion cache key, so changing them never serves stale results. An
+# explicit num_ctx or num_predict here replaces the per-request values
+# chosen by context shaping (see "Context Window" below).
+GENERATION_OPTIONS = {}
+
 # Enhanced system prompt with clearer instructions
 SYSTEM_PROMPT = """YOUR SOLE FUNCTION is to convert the user's raw text input into well-structured markdown. You are a formatting tool, NOT a creative assistant, editor, or conversational AI.
 
@@ -16,6 +24,172 @@ CRITICAL DIRECTIVES:
 
 Your output must be a pure, 1:1 markdown representation of the input text, enclosed in the specified tags. Failure to adhere to these rules makes your output useless."""
 
+# --- Live Output ---
+# Minimum time between output pane refreshes while tokens are streaming
+STREAM_RENDER_INTERVAL_MS = 50
+# The worker batches streamed tokens into one signal per interval (or once
+# this many characters are pending) to keep cross-thread traffic low
+TOKEN_FLUSH_INTERVAL_MS = 33
+TOKEN_FLUSH_MAX_CHARS = 4096
+# Characters of chatter tolerated before the opening <markdown> tag before
+# the model is reported as not following the output format
+ENVELOPE_MAX_PREAMBLE_CHARS = 200
+
+# --- Headless Batch Conversion ---
+# File extensions picked up when a directory is passed to `convert`
+BATCH_EXTENSIONS = (".txt",)
+# Number of documents kept in flight against the Ollama backend
+BATCH_DEFAULT_JOBS = 4
+
+# --- Chunked Conversion For Large Inputs ---
+# Inputs longer than this are split on paragraph/heading boundaries
+CHUNK_MAX_CHARS = 6000
+# Chunks converted concurrently; match the number of backend slots
+# (OLLAMA_NUM_PARALLEL) for best wall-clock time
+CHUNK_CONCURRENCY = 4
+
+# --- Startup ---
+# The web engine and markdown library are loaded this long after the window
+# is shown (or earlier, the first time the rendered preview needs them)
+DEFERRED_INIT_DELAY_MS = 100
+
+# --- Multiple Ollama Hosts ---
+# Empty: every request goes to ollama's default host (localhost:11434 or the
+# OLLAMA_HOST environment variable). Otherwise requests, and the chunks of a
+# large document, are spread over these hosts: each goes to the healthy host
+# with the fewest outstanding requests per unit of weight, and no host gets
+# more than `slots` at once (match its OLLAMA_NUM_PARALLEL). Entries are
+# URLs or dicts, e.g.
+#   OLLAMA_HOSTS = (
+#       {"host": "http://gpu1:11434", "slots": 4},
+#       {"host": "http://gpu2:11434", "slots": 2, "weight": 1},
+#   )
+# `weight` defaults to `slots`.
+OLLAMA_HOSTS = ()
+BACKEND_DEFAULT_SLOTS = 4
+# Consecutive failed requests before a host is taken out of rotation
+BACKEND_FAILURE_THRESHOLD = 2
+# Every host is probed this often; failing ones are ejected, recovered ones
+# re-admitted (0 disables the probes, so ejected hosts stay out)
+BACKEND_HEALTH_INTERVAL_S = 10
+BACKEND_HEALTH_TIMEOUT_S = 2
+
+# --- Model Warm-up & Keep-alive ---
+# How long Ollama keeps the model loaded after each request
+KEEP_ALIVE = "30m"
+# Load the model in the background as soon as the window opens
+WARMUP_ON_START = True
+# Re-ping the model while the window is open so it is never unloaded
+# (keep this below KEEP_ALIVE; 0 disables the periodic ping)
+KEEPALIVE_PING_INTERVAL_MS = 10 * 60 * 1000
+
+# --- Conversion Engine ---
+# "thread": one QThread per conversion running the blocking client.
+# "async": conversions share one asyncio loop using ollama.AsyncClient;
+# large files still stream from the mapped file on a QThread.
+CONVERSION_ENGINE = "thread"
+# Streamed generations the async engine keeps in flight at once
+ASYNC_MAX_CONCURRENCY = 128
+
+# --- Conversion Cache ---
+CACHE_ENABLED = True
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".file2md", "cache")
+# Compressed size on disk; least recently used entries are evicted beyond it
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# --- Performance Metrics ---
+# One JSON line per conversion (timings plus Ollama's final-chunk statistics)
+METRICS_LOG_ENABLED = True
+METRICS_LOG_PATH = os.path.join(os.path.expanduser("~"), ".file2md", "metrics.jsonl")
+
+# --- Progress Estimation ---
+# Rough characters per token, used to size the expected output
+PROGRESS_CHARS_PER_TOKEN = 4.0
+# Expected output tokens per input token (markdown adds a little syntax)
+PROGRESS_OUTPUT_RATIO = 1.1
+# Progress/ETA updates are sent at most this often unless the percentage changes
+PROGRESS_REPORT_INTERVAL_MS = 250
+
+# --- Document Queue ---
+# Queued documents converted at the same time (the interactive conversion
+# runs on its own and is not counted)
+QUEUE_CONCURRENCY = 2
+
+# --- Watch Folders (python -m File2MD watch ...) ---
+# Seconds between change checks
+WATCH_POLL_INTERVAL_S = 2.0
+# A file is converted once its size and mtime have been stable this long
+WATCH_SETTLE_S = 2.0
+# Full rescans catch in-place rewrites the directory polling cannot see
+WATCH_RESCAN_INTERVAL_S = 300
+# Content hash of every converted source, so unchanged files are skipped
+WATCH_STATE_PATH = os.path.join(os.path.expanduser("~"), ".file2md", "watch_state.json")
+# Temporary names used while files are still being written
+WATCH_IGNORE_PATTERNS = (".tmp", ".part", ".partial", ".crdownload", ".swp", "~")
+
+# --- Large Files ---
+# Files at least this big are memory-mapped and shown in a read-only,
+# virtualized preview instead of being loaded into the editor
+LARGE_FILE_THRESHOLD_BYTES = 20 * 1024 * 1024
+# Granularity of the newline index and of the decode-and-chunk reads
+LARGE_FILE_INDEX_BLOCK_BYTES = 1024 * 1024
+
+# --- Rule-based Fast Path ---
+# Paragraphs that are already unambiguous markdown (headings, lists, fenced
+# or indented code, quotes, tables) are converted without the model; only
+# the remaining prose is sent to it
+FAST_PATH_ENABLED = True
+# A structured run between two prose passages is only taken out if it has at
+# least this many characters; shorter ones stay with the prose, since
+# cutting the prose around them costs an extra model request
+FAST_PATH_MIN_SPLIT_CHARS = 200
+
+# --- Content Verification ---
+# Every conversion's words are compared with its input; segments with
+# dropped or added words are re-requested (not the whole document)
+VERIFY_ENABLED = True
+# Re-request rounds for failing segments; 0 only reports the mismatch
+VERIFY_MAX_RETRIES = 1
+# How far the word alignment looks ahead to resynchronize after a mismatch
+VERIFY_LOOKAHEAD_WORDS = 64
+
+# --- HTTP Service (python -m File2MD serve ...) ---
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+# Conversions running at once; the rest wait in a queue of at most
+# SERVER_QUEUE_LIMIT, beyond which requests get 429 with a Retry-After
+SERVER_WORKERS = 4
+SERVER_QUEUE_LIMIT = 32
+SERVER_MAX_BODY_BYTES = 64 * 1024 * 1024
+# Idle streams get an SSE comment this often, which also detects clients
+# that went away while their request was queued
+SERVER_KEEPALIVE_S = 15
+# Recent conversions kept for the /metrics latency percentiles
+SERVER_METRICS_WINDOW = 1000
+
+# --- Context Window ---
+# num_ctx is the smallest power of two (at least CONTEXT_MIN_TOKENS) that
+# holds the system prompt, a full CHUNK_MAX_CHARS chunk and its output cap.
+# Ollama reloads the model whenever num_ctx changes, so warm-up, keep-alive
+# pings and every request share this one value; it only grows if a request
+# needs more. num_predict is capped per request from the input's size.
+# Chunks that would not fit CONTEXT_MAX_TOKENS are split further, and a
+# request that still cannot fit is refused before it is sent.
+CONTEXT_SHAPING_ENABLED = True
+CONTEXT_MIN_TOKENS = 2048
+# The model's context window, or less to bound KV-cache memory
+CONTEXT_MAX_TOKENS = 32768
+# num_predict: the expected output tokens times this ratio, plus the headroom
+NUM_PREDICT_RATIO = 1.5
+NUM_PREDICT_HEADROOM = 64
+
+# --- File Loading ---
+# Bytes inspected to detect the encoding (BOMs, NUL bytes, UTF-8 validity)
+# and to reject binary files before anything else is read
+LOADER_SNIFF_BYTES = 64 * 1024
+# Read size for the incremental decode of the whole file
+LOADER_READ_BLOCK_BYTES = 1024 * 1024
+
 # ==============================================================================
 # 2. PROFESSIONAL WINDOWS-STYLE THEME
 # ==============================================================================
@@ -96,6 +270,13 @@ QPlainTextEdit:focus, QTextEdit:focus {{
     border: 1px solid #007fd4;
 }}
 
+/* Virtualized view used for large files */
+#LargeTextView {{
+    background-color: #252526;
+    border: 1px solid #333333;
+    border-radius: 4px;
+}}
+
 /* Container for Web View to match Text Edit style */
 #WebViewContainer {{
     background-color: #252526;
@@ -191,6 +372,34 @@ QSplitter::handle:horizontal:hover {{
     image: url('data:image/svg+xml,{SVG_HANDLE_HOVER}');
 }}
 
+QSplitter::handle:vertical {{
+    background-color: transparent;
+    height: 8px;
+}}
+QSplitter::handle:vertical:hover {{
+    background-color: #007fd4;
+}}
+
+/* Job Queue Table */
+QTableWidget#JobTable {{
+    background-color: #252526;
+    border: 1px solid #333333;
+    border-radius: 4px;
+    gridline-color: #333333;
+    selection-background-color: #264f78;
+    selection-color: #ffffff;
+    font-size: 9pt;
+}}
+QTableWidget#JobTable QHeaderView::section {{
+    background-color: #2d2d2d;
+    color: #999999;
+    border: none;
+    border-bottom: 1px solid #333333;
+    padding: 4px 6px;
+    font-size: 8pt;
+    font-weight: 600;
+}}
+
 /* Scrollbars */
 QScrollBar:vertical {{
     border: none;
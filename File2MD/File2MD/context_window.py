@@ -0,0 +1,118 @@
+import math
+import threading
+
+from config import (
+    SYSTEM_PROMPT, GENERATION_OPTIONS, CHUNK_MAX_CHARS, CONTEXT_SHAPING_ENABLED, CONTEXT_MIN_TOKENS,
+    CONTEXT_MAX_TOKENS, NUM_PREDICT_RATIO, NUM_PREDICT_HEADROOM, PROGRESS_CHARS_PER_TOKEN, PROGRESS_OUTPUT_RATIO
+)
+from progress import ENVELOPE_TOKENS
+
+# ==============================================================================
+# 25. CONTEXT-WINDOW AWARE REQUEST SHAPING (num_ctx / num_predict)
+# ==============================================================================
+
+# The chat template around the system prompt and the input
+TEMPLATE_TOKENS = 32
+SYSTEM_TOKENS = math.ceil(len(SYSTEM_PROMPT.encode('utf-8')) / PROGRESS_CHARS_PER_TOKEN) + TEMPLATE_TOKENS
+
+
+class RequestTooLarge(ValueError):
+    pass
+
+
+def context_limit():
+    # An explicit num_ctx in GENERATION_OPTIONS is what every request gets
+    return GENERATION_OPTIONS.get("num_ctx", CONTEXT_MAX_TOKENS)
+
+
+def estimate_request(text):
+    # (prompt tokens, num_predict). Estimated per UTF-8 byte rather than per
+    # character: scripts that take several bytes per character also take
+    # more tokens per character.
+    text_tokens = math.ceil(len(text.encode('utf-8')) / PROGRESS_CHARS_PER_TOKEN)
+    output_tokens = int(text_tokens * PROGRESS_OUTPUT_RATIO) + ENVELOPE_TOKENS
+    num_predict = GENERATION_OPTIONS.get("num_predict", int(output_tokens * NUM_PREDICT_RATIO) + NUM_PREDICT_HEADROOM)
+    return SYSTEM_TOKENS + text_tokens, num_predict
+
+
+def fits_context(text):
+    if not CONTEXT_SHAPING_ENABLED:
+        return True
+    prompt_tokens, num_predict = estimate_request(text)
+    return prompt_tokens + num_predict <= context_limit()
+
+
+def fitting_chars(text):
+    # Characters of text like this one (same bytes per character) that fit
+    # in one request; 0 when not even the system prompt fits
+    budget = context_limit() - SYSTEM_TOKENS - NUM_PREDICT_HEADROOM - int(ENVELOPE_TOKENS * NUM_PREDICT_RATIO)
+    if budget <= 0 or not text:
+        return 0
+    tokens_per_char = len(text.encode('utf-8')) / PROGRESS_CHARS_PER_TOKEN / len(text)
+    return int(budget / (1 + PROGRESS_OUTPUT_RATIO * NUM_PREDICT_RATIO) / tokens_per_char)
+
+
+def context_bucket(tokens):
+    # Smallest power of two holding `tokens`, within the configured bounds
+    bucket = CONTEXT_MIN_TOKENS
+    while bucket < tokens:
+        bucket *= 2
+    return min(bucket, CONTEXT_MAX_TOKENS)
+
+
+class ContextShaper:
+    # Ollama reloads the model whenever num_ctx changes, so one num_ctx is
+    # pinned for the session: the bucket a full CHUNK_MAX_CHARS chunk needs,
+    # which every chunk, fast-path fragment, retry, warm-up and keep-alive
+    # ping shares. It only grows when a request needs more (scripts with
+    # several bytes per character), and stays there. num_predict is still
+    # sized per request.
+    def __init__(self):
+        self.num_ctx = None
+        self._lock = threading.Lock()
+
+    def options(self, text):
+        # Generation options for one request; raises RequestTooLarge when
+        # the request cannot fit the context window
+        if not CONTEXT_SHAPING_ENABLED:
+            return GENERATION_OPTIONS or None
+        prompt_tokens, num_predict = estimate_request(text)
+        needed = prompt_tokens + num_predict
+        if needed > context_limit():
+            raise RequestTooLarge(
+                f"Request needs about {needed:,} tokens of context ({prompt_tokens:,} prompt + "
+                f"{num_predict:,} output) but at most {context_limit():,} are allowed"
+            )
+        options = {"num_ctx": self.reserve(needed), "num_predict": num_predict}
+        options.update(GENERATION_OPTIONS)
+        return options
+
+    def reserve(self, tokens):
+        with self._lock:
+            if self.num_ctx is None:
+                prompt_tokens, num_predict = estimate_request("x" * CHUNK_MAX_CHARS)
+                self.num_ctx = context_bucket(min(prompt_tokens + num_predict, context_limit()))
+            bucket = context_bucket(tokens)
+            if bucket > self.num_ctx:
+                self.num_ctx = bucket
+            return self.num_ctx
+
+    def warm_up_options(self):
+        # Loads the model with the pinned context, so neither the first
+        # conversion nor a keep-alive ping makes Ollama reload it
+        if not CONTEXT_SHAPING_ENABLED:
+            return GENERATION_OPTIONS or None
+        options = {"num_ctx": self.reserve(0)}
+        options.update(GENERATION_OPTIONS)
+        return options
+
+
+_shaper = ContextShaper()
+
+
+def request_options(text):
+    return _shaper.options(text)
+
+
+def warm_up_options():
+    return _shaper.warm_up_options()
@@ -0,0 +1,328 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    MODEL_NAME, SYSTEM_PROMPT, KEEP_ALIVE, CHUNK_MAX_CHARS,
+    TOKEN_FLUSH_INTERVAL_MS, TOKEN_FLUSH_MAX_CHARS, VERIFY_ENABLED, VERIFY_MAX_RETRIES
+)
+from backends import NoBackendAvailable, get_backend_pool, chunk_concurrency
+from chunking import convert_chunks
+from context_window import request_options, warm_up_options
+from fast_path import plan_units, needs_single_request
+from envelope import EnvelopeParser
+from metrics import StreamTimer
+from verifier import verify
+
+# ==============================================================================
+# 6. HEADLESS CONVERSION CORE
+# ==============================================================================
+
+class ConversionCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    # Shared by everything working on one conversion. cancel() may be called
+    # from any thread: it closes the HTTP clients of the streams in flight,
+    # so a read blocked on the socket returns at once and Ollama sees the
+    # connection drop and stops generating.
+    def __init__(self):
+        self._event = threading.Event()
+        self._closers = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            closers, self._closers = self._closers, []
+        for close in closers:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise ConversionCancelled()
+
+    def register(self, close):
+        with self._lock:
+            if not self._event.is_set():
+                self._closers.append(close)
+                return
+        close()
+
+    def unregister(self, close):
+        with self._lock:
+            if close in self._closers:
+                self._closers.remove(close)
+
+
+def stream_chunks(text, cancel=None):
+    # Imported on first use; loading the client is not needed to show the window
+    import ollama
+
+    request = dict(
+        model=MODEL_NAME,
+        prompt=text,
+        system=SYSTEM_PROMPT,
+        options=request_options(text),
+        keep_alive=KEEP_ALIVE,
+        stream=True
+    )
+    pool = get_backend_pool()
+    if pool is not None:
+        return _pooled_stream(pool, request, cancel)
+    if cancel is None:
+        return ollama.generate(**request)
+    # A client of its own, so cancelling closes only this conversion's connection
+    return _cancellable_stream(ollama.Client(), request, cancel)
+
+
+def _pooled_stream(pool, request, cancel):
+    # Runs the request on the least busy healthy host. A host that fails
+    # before streaming anything counts a failure and the request moves on
+    # to another host; once output has been streamed the error is raised.
+    import ollama
+
+    tried = []
+    while True:
+        backend = pool.acquire(tried, cancel)
+        streamed = False
+        try:
+            for chunk in _cancellable_stream(ollama.Client(host=backend.host), request, cancel or CancelToken()):
+                streamed = True
+                yield chunk
+        except (ConversionCancelled, GeneratorExit):
+            pool.release(backend)
+            raise
+        except Exception as e:
+            pool.release(backend, failed=True, error=e)
+            tried.append(backend)
+            if streamed or not pool.has_candidate(tried):
+                raise
+            continue
+        pool.release(backend)
+        return
+
+
+def _cancellable_stream(client, request, cancel):
+    close = client._client.close
+    cancel.check()
+    cancel.register(close)
+    try:
+        for chunk in client.generate(**request):
+            cancel.check()
+            yield chunk
+    except ConversionCancelled:
+        raise
+    except Exception:
+        # Whatever the closed connection raised, report it as a cancellation
+        cancel.check()
+        raise
+    finally:
+        cancel.unregister(close)
+        close()
+
+
+def warm_up_model():
+    # An empty prompt makes Ollama load the model (and reset its keep-alive
+    # timer) without generating anything. Returns the load time in seconds.
+    import ollama
+
+    pool = get_backend_pool()
+    if pool is None:
+        response = ollama.generate(model=MODEL_NAME, prompt="", options=warm_up_options(), keep_alive=KEEP_ALIVE)
+        return (response.get('load_duration') or 0) / 1e9
+
+    # Every healthy host loads the model at once; hosts that fail are left
+    # to the health checks unless none succeeds
+    def warm_up(backend):
+        response = ollama.Client(host=backend.host).generate(
+            model=MODEL_NAME, prompt="", options=options, keep_alive=KEEP_ALIVE
+        )
+        return (response.get('load_duration') or 0) / 1e9
+
+    options = warm_up_options()
+    backends = pool.healthy_backends()
+    if not backends:
+        raise NoBackendAvailable(pool.describe())
+    with ThreadPoolExecutor(max_workers=len(backends)) as executor:
+        futures = [executor.submit(warm_up, backend) for backend in backends]
+    loaded = [future.result() for future in futures if future.exception() is None]
+    if not loaded:
+        raise futures[0].exception()
+    return max(loaded)
+
+
+def describe_error(e):
+    error_message = f"{type(e).__name__}: {e}"
+    if "connection refused" in str(e).lower():
+        error_message += "\n\nCannot connect to Ollama.\nPlease ensure the Ollama application is running."
+    elif "model" in str(e).lower() and "not found" in str(e).lower():
+        error_message += f"\n\nModel '{MODEL_NAME}' not found.\nRun: ollama pull {MODEL_NAME}"
+    return error_message
+
+
+class TokenCoalescer:
+    # Collects streamed tokens and hands them to `emit` in batches, on a
+    # time budget or size threshold. The first token is flushed at once so
+    # time-to-first-token is unaffected; callers must flush() at the end.
+    def __init__(self, emit, interval_ms=TOKEN_FLUSH_INTERVAL_MS, max_chars=TOKEN_FLUSH_MAX_CHARS):
+        self.emit = emit
+        self.interval = interval_ms / 1000.0
+        self.max_chars = max_chars
+        self._parts = []
+        self._pending_chars = 0
+        self._last_flush = 0.0
+
+    def add(self, token):
+        if not token:
+            return
+        self._parts.append(token)
+        self._pending_chars += len(token)
+        if self._pending_chars >= self.max_chars or time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if self._parts:
+            text = "".join(self._parts)
+            self._parts = []
+            self._pending_chars = 0
+            self.emit(text)
+
+
+class ConversionResult:
+    def __init__(self, content, parsed, token_count, elapsed, cached=False, metrics=None):
+        self.content = content
+        self.parsed = parsed
+        self.token_count = token_count
+        self.elapsed = elapsed
+        self.cached = cached
+        # StreamTimer for the request(s) behind this result; None when cached
+        self.metrics = metrics
+        # verifier.Verification once checked; None when verification is off
+        self.verification = None
+
+    @property
+    def cacheable(self):
+        return self.parsed and (self.verification is None or self.verification.ok)
+
+
+def convert_text(text, on_token=None, cancel=None):
+    timer = StreamTimer()
+    timer.input_chars = len(text)
+    parser = EnvelopeParser()
+    raw_parts = []
+    body_parts = []
+    token_count = 0
+
+    for chunk in stream_chunks(text, cancel):
+        timer.observe(chunk)
+        token = chunk.get('response', '')
+        raw_parts.append(token)
+        body_parts.append(parser.feed(token))
+        token_count += 1
+        if on_token is not None:
+            on_token(token)
+
+    content, parsed = parser.result("".join(body_parts), "".join(raw_parts))
+    eval_count = timer.server.get('eval_count')
+    return ConversionResult(
+        content, parsed, eval_count or token_count, time.perf_counter() - timer.started_at, metrics=timer
+    )
+
+
+def rule_based_result(text, markdown):
+    timer = StreamTimer()
+    timer.input_chars = timer.fast_path_chars = len(text)
+    return ConversionResult(markdown, True, 0, 0.0, metrics=timer)
+
+
+def convert_unit(unit, on_token=None, cancel=None):
+    # One (text, markdown) unit from fast_path.plan_units
+    text, markdown = unit
+    if markdown is not None:
+        return rule_based_result(text, markdown)
+    return convert_text(text, on_token, cancel)
+
+
+def join_chunk_contents(contents):
+    return "\n\n".join(content for content in contents if content)
+
+
+def accept_repair(result, report, fixes, content, candidate):
+    # Shared by both engines: the repaired output replaces the original
+    # only if it is closer to the input
+    for fix in fixes:
+        if fix.metrics is not None:
+            # Retried text is not new input
+            fix.metrics.input_chars = 0
+        result.metrics.merge(fix.metrics)
+        result.token_count += fix.token_count
+    candidate.retried = report.retried + len(fixes)
+    if candidate.mismatches < report.mismatches:
+        result.content = content
+        return candidate
+    report.retried = candidate.retried
+    return report
+
+
+def finish_verification(result, report):
+    result.verification = report
+    if result.metrics is not None:
+        result.metrics.verification = report.summary()
+    return result
+
+
+def verify_and_repair(text, result, cancel=None):
+    # Checks that the output kept every word of the input and re-requests
+    # only the segments that did not, up to VERIFY_MAX_RETRIES rounds. A
+    # segment may need more context than one request allows, so each is
+    # planned like a document of its own.
+    report = verify(text, result.content)
+    for _ in range(VERIFY_MAX_RETRIES):
+        if report.ok or not report.segments:
+            break
+        fixes = convert_chunks(
+            report.segment_sources(), lambda segment: _convert_document(segment, None, None, cancel),
+            chunk_concurrency()
+        )
+        content = report.repaired([fix.content for fix in fixes])
+        report = accept_repair(result, report, fixes, content, verify(text, content))
+    return finish_verification(result, report)
+
+
+def convert_document(text, on_chunk_ready=None, on_token=None, cancel=None):
+    result = _convert_document(text, on_chunk_ready, on_token, cancel)
+    if VERIFY_ENABLED:
+        result = verify_and_repair(text, result, cancel)
+    return result
+
+
+def _convert_document(text, on_chunk_ready, on_token, cancel):
+    # With chunking, on_token is called from the pool threads
+    units = plan_units(text, CHUNK_MAX_CHARS)
+    if needs_single_request(units):
+        return convert_text(text, on_token, cancel)
+
+    timer = StreamTimer()
+    results = convert_chunks(
+        units, lambda unit: convert_unit(unit, on_token, cancel), chunk_concurrency(), on_chunk_ready
+    )
+    for result in results:
+        timer.merge(result.metrics)
+
+    return ConversionResult(
+        join_chunk_contents(result.content for result in results),
+        all(result.parsed for result in results),
+        sum(result.token_count for result in results),
+        time.perf_counter() - timer.started_at,
+        metrics=timer
+    )
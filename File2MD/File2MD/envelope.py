@@ -0,0 +1,100 @@
+from config import ENVELOPE_MAX_PREAMBLE_CHARS
+
+# ==============================================================================
+# 12. STREAMING <markdown> ENVELOPE PARSER
+# ==============================================================================
+
+START_TAG = "<markdown>"
+END_TAG = "</markdown>"
+
+PREAMBLE = "preamble"
+BODY = "body"
+CLOSED = "closed"
+
+
+def _partial_tag_length(text, tag):
+    # Length of the longest suffix of `text` that is a proper prefix of `tag`
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+
+class EnvelopeParser:
+    # Incremental state machine fed one token at a time. feed() returns the
+    # clean body text that became final with this token; tags split across
+    # tokens are handled by carrying at most len(tag) - 1 characters, so
+    # memory per token is constant.
+    def __init__(self, on_close=None, max_preamble_chars=ENVELOPE_MAX_PREAMBLE_CHARS):
+        self.on_close = on_close
+        self.state = PREAMBLE
+        self.max_preamble_chars = max_preamble_chars
+        self.preamble_chars = 0
+        self.body_chars = 0
+        self.trailing_chars = 0
+        self._carry = ""
+        self._body_started = False
+
+    @property
+    def opened(self):
+        return self.state != PREAMBLE
+
+    @property
+    def closed(self):
+        return self.state == CLOSED
+
+    @property
+    def compliant(self):
+        # False once the model has chattered for too long without opening
+        # the envelope; it can become True again if the tag shows up later.
+        return self.opened or self.preamble_chars <= self.max_preamble_chars
+
+    def feed(self, token):
+        if self.state == CLOSED:
+            self.trailing_chars += len(token)
+            return ""
+
+        text = self._carry + token
+        self._carry = ""
+
+        if self.state == PREAMBLE:
+            tag_index = text.find(START_TAG)
+            if tag_index == -1:
+                keep = _partial_tag_length(text, START_TAG)
+                self.preamble_chars += len(text) - keep
+                self._carry = text[len(text) - keep:]
+                return ""
+            self.preamble_chars += tag_index
+            self.state = BODY
+            text = text[tag_index + len(START_TAG):]
+
+        if not self._body_started:
+            # Leading whitespace after the opening tag is not content
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._body_started = True
+
+        end_index = text.find(END_TAG)
+        if end_index != -1:
+            self.state = CLOSED
+            self.trailing_chars += len(text) - end_index - len(END_TAG)
+            text = text[:end_index]
+        else:
+            keep = _partial_tag_length(text, END_TAG)
+            self._carry = text[len(text) - keep:]
+            text = text[:len(text) - keep]
+
+        self.body_chars += len(text)
+        if self.state == CLOSED and self.on_close is not None:
+            self.on_close()
+        return text
+
+    def result(self, body, raw_output):
+        # Final (content, parsed) pair: the stripped body when the envelope
+        # was closed, otherwise the whole raw output as a fallback.
+        if self.closed:
+            content = body.strip()
+            if content:
+                return content, True
+        return raw_output.strip(), False
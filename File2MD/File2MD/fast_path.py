@@ -0,0 +1,115 @@
+import re
+
+from config import FAST_PATH_ENABLED, FAST_PATH_MIN_SPLIT_CHARS, CHUNK_MAX_CHARS
+from chunking import split_paragraphs, split_into_chunks
+
+# ==============================================================================
+# 20. RULE-BASED FAST PATH (already-structured paragraphs skip the model)
+# ==============================================================================
+
+ATX_HEADING = re.compile(r"^#{1,6}\s+\S")
+SETEXT_UNDERLINE = re.compile(r"^(=+|-+)\s*$")
+BULLET_ITEM = re.compile(r"^(\s*)([-*+•])\s+(\S.*)$")
+NUMBERED_ITEM = re.compile(r"^(\s*)(\d{1,9})[.)]\s+(\S.*)$")
+FENCE = re.compile(r"^(```|~~~)")
+THEMATIC_BREAK = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+TABLE_SEPARATOR = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+
+
+def _list_items(lines, pattern, marker):
+    # Every line must be an item; a wrapped continuation line makes the
+    # paragraph ambiguous and it goes to the model instead
+    items = []
+    for line in lines:
+        match = pattern.match(line)
+        if match is None:
+            return None
+        items.append(f"{match.group(1)}{marker(match)} {match.group(3)}")
+    return "\n".join(items)
+
+
+def _indented_code(lines):
+    if not all(line.startswith(("    ", "\t")) for line in lines):
+        return None
+    body = "\n".join(line[4:] if line.startswith("    ") else line[1:] for line in lines)
+    return f"```\n{body}\n```"
+
+
+def convert_paragraph(paragraph):
+    # Returns the markdown for a paragraph whose structure is unambiguous,
+    # or None when it needs the model. Conversions only normalize markers;
+    # the text itself is never changed.
+    lines = paragraph.split("\n")
+    first = lines[0]
+
+    if len(lines) == 1:
+        if ATX_HEADING.match(first) or THEMATIC_BREAK.match(first):
+            return first.strip()
+    if len(lines) == 2 and first.strip() and SETEXT_UNDERLINE.match(lines[1]) and not BULLET_ITEM.match(first):
+        return ("# " if lines[1].startswith("=") else "## ") + first.strip()
+    if len(lines) >= 2 and FENCE.match(first) and lines[-1].startswith(FENCE.match(first).group(1)):
+        return paragraph
+    if all(line.startswith(">") for line in lines):
+        return paragraph
+    if len(lines) >= 2 and all(line.strip().startswith("|") for line in lines) and TABLE_SEPARATOR.match(lines[1].strip()):
+        return paragraph
+
+    markdown = _list_items(lines, BULLET_ITEM, lambda match: "-")
+    if markdown is not None:
+        return markdown
+    # A single "2024. Was a good year" line is more likely prose than a list
+    if len(lines) >= 2:
+        markdown = _list_items(lines, NUMBERED_ITEM, lambda match: f"{match.group(2)}.")
+        if markdown is not None:
+            return markdown
+    return _indented_code(lines)
+
+
+def plan_units(text, max_chars=CHUNK_MAX_CHARS):
+    # Splits a document into conversion units, in order: (text, markdown)
+    # pairs where markdown is the rule-based result, or None for text the
+    # model must convert. Consecutive model paragraphs are kept together and
+    # chunked like any other input, so the model still sees their context.
+    if not FAST_PATH_ENABLED:
+        return [(chunk, None) for chunk in split_into_chunks(text, max_chars)]
+
+    # Runs of [paragraphs, markdowns] with the same kind; markdowns is None
+    # for a model run
+    runs = []
+    for paragraph in split_paragraphs(text):
+        markdown = convert_paragraph(paragraph)
+        if runs and (runs[-1][1] is None) == (markdown is None):
+            runs[-1][0].append(paragraph)
+            if markdown is not None:
+                runs[-1][1].append(markdown)
+        else:
+            runs.append([[paragraph], None if markdown is None else [markdown]])
+
+    units = []
+    pending = []
+    for index, (paragraphs, markdowns) in enumerate(runs):
+        # A short structured run between two prose runs is not worth the
+        # extra request it would cost to cut the prose around it
+        between_prose = 0 < index < len(runs) - 1
+        if markdowns is None or (between_prose and sum(map(len, paragraphs)) < FAST_PATH_MIN_SPLIT_CHARS):
+            pending.extend(paragraphs)
+            continue
+        if pending:
+            units.extend((chunk, None) for chunk in split_into_chunks("\n\n".join(pending), max_chars))
+            pending = []
+        units.append(("\n\n".join(paragraphs), "\n\n".join(markdowns)))
+    if pending:
+        units.extend((chunk, None) for chunk in split_into_chunks("\n\n".join(pending), max_chars))
+    return units
+
+
+def needs_single_request(units):
+    # True when the whole document is one model unit; callers then send the
+    # original text unchanged, exactly as without the fast path
+    return len(units) <= 1 and all(markdown is None for _, markdown in units)
+
+
+def iter_units(chunks):
+    # plan_units over a lazily decoded chunk stream (large-file mode)
+    for chunk in chunks:
+        yield from plan_units(chunk)
@@ -0,0 +1,119 @@
+import codecs
+
+from config import LOADER_SNIFF_BYTES, LOADER_READ_BLOCK_BYTES
+
+# ==============================================================================
+# 19. TEXT FILE LOADING (encoding detection, binary rejection)
+# ==============================================================================
+
+# Longer BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+ENCODING_NAMES = {
+    "utf-8": "UTF-8",
+    "utf-8-sig": "UTF-8 (BOM)",
+    "utf-16": "UTF-16",
+    "utf-16-le": "UTF-16 LE",
+    "utf-16-be": "UTF-16 BE",
+    "utf-32": "UTF-32",
+    "cp1252": "Windows-1252",
+    "latin-1": "Latin-1",
+}
+
+# Bytes cp1252 leaves undefined; their presence means plain Latin-1
+CP1252_UNDEFINED = frozenset(b"\x81\x8d\x8f\x90\x9d")
+# C0 controls other than tab, newlines, form feed and escape
+CONTROL_BYTES = frozenset(range(32)) - frozenset(b"\t\n\r\x0c\x1b")
+
+
+class BinaryFileError(ValueError):
+    pass
+
+
+def describe_encoding(encoding):
+    return ENCODING_NAMES.get(encoding, encoding)
+
+
+def is_ascii_compatible(encoding):
+    # Newlines are single b"\n" bytes, which large-file mode relies on
+    return not encoding.startswith(("utf-16", "utf-32"))
+
+
+def _guess_utf16(prefix):
+    # BOM-less UTF-16 text is mostly ASCII, so every other byte is NUL
+    sample = prefix[:4096]
+    half = max(1, len(sample) // 2)
+    even_nuls = sample[0::2].count(0) / half
+    odd_nuls = sample[1::2].count(0) / half
+    if odd_nuls > 0.4 and even_nuls < 0.05:
+        return "utf-16-le"
+    if even_nuls > 0.4 and odd_nuls < 0.05:
+        return "utf-16-be"
+    return None
+
+
+def _fallback_single_byte(data):
+    return "latin-1" if CP1252_UNDEFINED.intersection(data) else "cp1252"
+
+
+def sniff_encoding(prefix, at_eof=True):
+    # Decides from the first LOADER_SNIFF_BYTES only. Raises BinaryFileError
+    # for anything that does not look like text.
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding
+    if b"\x00" in prefix:
+        encoding = _guess_utf16(prefix)
+        if encoding is None:
+            raise BinaryFileError("the file contains NUL bytes")
+        return encoding
+    if prefix and sum(1 for byte in prefix if byte in CONTROL_BYTES) > len(prefix) * 0.05:
+        raise BinaryFileError("the file contains too many control characters")
+    try:
+        # Incremental, so a multi-byte sequence cut at the end of the prefix
+        # is not mistaken for an error
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=at_eof)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return _fallback_single_byte(prefix)
+
+
+def detect_encoding(path):
+    with open(path, 'rb') as f:
+        prefix = f.read(LOADER_SNIFF_BYTES)
+        at_eof = not f.read(1)
+    return sniff_encoding(prefix, at_eof)
+
+
+def _decode_file(path, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parts = []
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(LOADER_READ_BLOCK_BYTES)
+            if not block:
+                break
+            parts.append(decoder.decode(block))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+
+def read_text(path):
+    # Returns (text, encoding). The file is read once, in blocks, through an
+    # incremental decoder. Only if the sniffed prefix was valid UTF-8 but a
+    # later block is not (rare) is the file decoded a second time, with the
+    # single-byte fallback.
+    encoding = detect_encoding(path)
+    try:
+        return _decode_file(path, encoding), encoding
+    except UnicodeDecodeError as e:
+        if encoding != "utf-8":
+            raise
+        encoding = _fallback_single_byte(e.object)
+        return _decode_file(path, encoding), encoding
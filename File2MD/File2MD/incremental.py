@@ -0,0 +1,88 @@
+import threading
+
+from config import CHUNK_MAX_CHARS
+from chunking import split_paragraphs
+from fast_path import plan_units
+from verifier import align
+
+# ==============================================================================
+# 22. INCREMENTAL RE-CONVERSION OF EDITED INPUT
+# ==============================================================================
+
+class ConversionMemory:
+    # Remembers the last conversion as segments: runs of source paragraphs
+    # paired (by word alignment) with the output blocks they became. A new
+    # input is matched against them paragraph by paragraph; segments found
+    # unchanged are reused and only the paragraphs around edits are sent to
+    # the model. Segments whose words did not match are never remembered.
+    def __init__(self):
+        self._by_first_paragraph = {}
+        self._lock = threading.Lock()
+
+    def remember(self, source, output):
+        paragraphs, blocks, groups, _, _ = align(source, output)
+        by_first_paragraph = {}
+        for first_paragraph, last_paragraph, first_block, last_block, failing in groups:
+            if failing or last_block < first_block:
+                continue
+            segment = tuple(paragraphs[first_paragraph:last_paragraph + 1])
+            markdown = "\n\n".join(blocks[first_block:last_block + 1])
+            by_first_paragraph.setdefault(segment[0], []).append((segment, markdown))
+        for candidates in by_first_paragraph.values():
+            # Longest first, so the largest unchanged run wins
+            candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+        with self._lock:
+            self._by_first_paragraph = by_first_paragraph
+
+    def clear(self):
+        with self._lock:
+            self._by_first_paragraph = {}
+
+    def _match(self, paragraphs, index):
+        for segment, markdown in self._by_first_paragraph.get(paragraphs[index], ()):
+            if tuple(paragraphs[index:index + len(segment)]) == segment:
+                return segment, markdown
+        return None
+
+    def plan(self, text, max_chars=CHUNK_MAX_CHARS):
+        # Returns (units, reused_chars): units in the fast_path.plan_units
+        # format, where remembered segments come with their markdown and
+        # everything else is planned as usual
+        units = []
+        pending = []
+        reused_chars = 0
+        # Whether units[-1] came from memory rather than from plan_units
+        last_reused = False
+
+        def flush_pending():
+            nonlocal last_reused
+            if pending:
+                units.extend(plan_units("\n\n".join(pending), max_chars))
+                pending.clear()
+                last_reused = False
+
+        with self._lock:
+            paragraphs = split_paragraphs(text) if self._by_first_paragraph else []
+            index = 0
+            while index < len(paragraphs):
+                match = self._match(paragraphs, index)
+                if match is None:
+                    pending.append(paragraphs[index])
+                    index += 1
+                    continue
+                flush_pending()
+                segment, markdown = match
+                segment_text = "\n\n".join(segment)
+                reused_chars += len(segment_text)
+                if last_reused:
+                    # Merge with the previous remembered segment (and count
+                    # the separator, so reused_chars matches the unit lengths)
+                    reused_chars += 2
+                    previous_text, previous_markdown = units[-1]
+                    units[-1] = (f"{previous_text}\n\n{segment_text}", f"{previous_markdown}\n\n{markdown}")
+                else:
+                    units.append((segment_text, markdown))
+                    last_reused = True
+                index += len(segment)
+        flush_pending()
+        return units, reused_chars
@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import os
+import time
+
+from config import QUEUE_CONCURRENCY
+
+# ==============================================================================
+# 16. MULTI-DOCUMENT JOB QUEUE
+# ==============================================================================
+
+QUEUED = "Queued"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, path, priority=0):
+        self.id = next(Job._ids)
+        self.path = path
+        self.name = os.path.basename(path)
+        try:
+            self.size = os.path.getsize(path)
+        except OSError:
+            self.size = 0
+        self.priority = priority
+        self.status = QUEUED
+        self.progress = 0
+        self.queued_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+        self.content = ""
+        self.parsed = False
+        self.cached = False
+        self.error = ""
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATES
+
+    @property
+    def wait_time(self):
+        if self.started_at is None:
+            return None
+        return self.started_at - self.queued_at
+
+    @property
+    def run_time(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+class JobScheduler:
+    # Hands out queued jobs while fewer than `concurrency` are running.
+    # Higher priority first, then the smallest document, which minimizes
+    # the mean time to completion; ties keep submission order. Entries are
+    # never removed from the heap: re-prioritizing pushes a new entry and
+    # stale ones are skipped when popped.
+    def __init__(self, concurrency=QUEUE_CONCURRENCY):
+        self.concurrency = concurrency
+        self.jobs = {}
+        self.running = set()
+        self._heap = []
+        self._seq = itertools.count()
+
+    def _push(self, job):
+        heapq.heappush(self._heap, (-job.priority, job.size, next(self._seq), job.id, job.priority))
+
+    def add(self, job):
+        self.jobs[job.id] = job
+        self._push(job)
+        return job
+
+    def prioritize(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return
+        # One step above every other queued job
+        job.priority = max((other.priority for other in self.jobs.values() if other.status == QUEUED), default=0) + 1
+        self._push(job)
+
+    def next_jobs(self):
+        started = []
+        while self._heap and len(self.running) < self.concurrency:
+            _, _, _, job_id, priority = heapq.heappop(self._heap)
+            job = self.jobs.get(job_id)
+            if job is None or job.status != QUEUED or job.priority != priority:
+                continue
+            job.status = RUNNING
+            job.started_at = time.perf_counter()
+            self.running.add(job_id)
+            started.append(job)
+        return started
+
+    def finish(self, job_id, status):
+        job = self.jobs[job_id]
+        job.status = status
+        job.finished_at = time.perf_counter()
+        if job.started_at is None:
+            job.started_at = job.finished_at
+        self.running.discard(job_id)
+        return job
+
+    def remove(self, job_id):
+        # Queued jobs are dropped; running ones must be finished first
+        job = self.jobs.get(job_id)
+        if job is not None and job.status != RUNNING:
+            del self.jobs[job_id]
+        return job
+
+    def clear_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished:
+            del self.jobs[job_id]
+        return finished
+
+
+def unique_output_path(directory, name, taken):
+    # <stem>.md, or <stem> (2).md etc. when two jobs share a name or the
+    # file already exists in the directory
+    stem = os.path.splitext(name)[0]
+    candidate = f"{stem}.md"
+    counter = 2
+    while candidate.lower() in taken or os.path.exists(os.path.join(directory, candidate)):
+        candidate = f"{stem} ({counter}).md"
+        counter += 1
+    taken.add(candidate.lower())
+    return os.path.join(directory, candidate)
@@ -0,0 +1,95 @@
+import bisect
+import codecs
+import mmap
+import os
+
+from config import LARGE_FILE_INDEX_BLOCK_BYTES, CHUNK_MAX_CHARS
+from chunking import split_into_chunks
+
+# ==============================================================================
+# 18. LARGE-FILE MODE (memory-mapped input)
+# ==============================================================================
+
+# Longest line slice decoded for display
+MAX_DISPLAY_LINE_BYTES = 4096
+
+
+class MappedTextFile:
+    # A read-only, memory-mapped text file. Opening it only counts newlines
+    # per index block (one count per LARGE_FILE_INDEX_BLOCK_BYTES), so the
+    # index stays tiny; a line's offset is found by jumping to its block
+    # and scanning forward from there. Only ASCII-compatible encodings are
+    # supported, since lines are located by their b"\n" bytes.
+    def __init__(self, path, encoding='utf-8', block_bytes=LARGE_FILE_INDEX_BLOCK_BYTES):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.encoding = encoding
+        self.block_bytes = block_bytes
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap refuses empty files
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        # Lines that start before each block
+        self._block_lines = []
+        newlines = 0
+        for start in range(0, self.size, block_bytes):
+            self._block_lines.append(newlines)
+            newlines += self._map[start:start + block_bytes].count(b"\n")
+        ends_with_newline = self.size > 0 and self._map[self.size - 1:self.size] == b"\n"
+        self.line_count = newlines + (0 if ends_with_newline or not self.size else 1)
+        # Last resolved (line, offset); scrolling mostly moves a few lines
+        self._cursor = (0, 0)
+
+    def line_offset(self, line):
+        if line <= 0:
+            return 0
+        if line >= self.line_count:
+            return self.size
+        # Line n starts after the n-th newline: begin at the last block with
+        # fewer than n newlines before it, or at the cursor if it is closer
+        block = bisect.bisect_right(self._block_lines, line - 1) - 1
+        offset = block * self.block_bytes
+        current = self._block_lines[block]
+        cursor_line, cursor_offset = self._cursor
+        if current <= cursor_line <= line:
+            current, offset = cursor_line, cursor_offset
+        while current < line:
+            offset = self._map.find(b"\n", offset) + 1
+            current += 1
+        self._cursor = (line, offset)
+        return offset
+
+    def lines(self, first, count):
+        result = []
+        offset = self.line_offset(first)
+        for _ in range(max(0, min(count, self.line_count - first))):
+            end = self._map.find(b"\n", offset)
+            if end < 0:
+                end = self.size
+            raw = self._map[offset:min(end, offset + MAX_DISPLAY_LINE_BYTES)]
+            result.append(raw.decode(self.encoding, errors='replace').rstrip("\r"))
+            offset = end + 1
+        return result
+
+    def iter_chunks(self, max_chars=CHUNK_MAX_CHARS):
+        # Decodes the mapping block by block with an incremental decoder and
+        # yields conversion chunks, cutting the text at the last paragraph
+        # (or line) break seen so far. Only one block of text is held at once.
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        pending = ""
+        for start in range(0, self.size, self.block_bytes):
+            pending += decoder.decode(self._map[start:start + self.block_bytes])
+            cut = pending.rfind("\n\n")
+            if cut < 0:
+                cut = pending.rfind("\n")
+            if cut > 0:
+                head, pending = pending[:cut], pending[cut:].lstrip("\n")
+                yield from split_into_chunks(head, max_chars)
+        pending += decoder.decode(b"", final=True)
+        if pending.strip():
+            yield from split_into_chunks(pending, max_chars)
+
+    def close(self):
+        if self.size:
+            self._map.close()
+        self._file.close()
@@ -1,34 +1,74 @@
 import os
-import markdown
+import time
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QPlainTextEdit, QTextEdit, QFileDialog, QSplitter,
     QStatusBar, QLabel, QProgressBar, QStackedLayout
 )
-from PySide6.QtCore import Qt, QThread, QTimer, QUrl
-from PySide6.QtWebEngineWidgets import QWebEngineView
-
-from ui_components import CustomTitleBar
-from worker import ConversionWorker
-from config import MARKDOWN_CSS
+from PySide6.QtCore import Qt, QThread, QTimer, QUrl, Signal
+from PySide6.QtGui import QTextCursor, QKeySequence, QShortcut
+
+from ui_components import CustomTitleBar, JobQueuePanel, LargeTextView
+from worker import ConversionWorker, WarmupWorker, AsyncEngineBridge, AsyncConversionJob, JobWorker
+from envelope import EnvelopeParser
+from text_buffer import TextBuffer
+from cache import get_cache
+from metrics import append_record, format_summary
+from progress import format_eta
+from large_file import MappedTextFile
+from incremental import ConversionMemory
+from file_loader import read_text, detect_encoding, describe_encoding, is_ascii_compatible, BinaryFileError
+from job_queue import Job, JobScheduler, DONE, FAILED, CANCELLED, RUNNING, unique_output_path
+from config import (
+    STREAM_RENDER_INTERVAL_MS, CONVERSION_ENGINE, WARMUP_ON_START, KEEPALIVE_PING_INTERVAL_MS,
+    DEFERRED_INIT_DELAY_MS, BATCH_EXTENSIONS, LARGE_FILE_THRESHOLD_BYTES
+)
 
 class MainWindow(QMainWindow):
+    # Emitted once the deferred components (web engine, markdown) are ready
+    interactive = Signal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("File2MD")
         self.setMinimumSize(900, 700)
         self.setWindowFlags(Qt.FramelessWindowHint)
 
-        self.markdown_buffer = ""
+        self.markdown_buffer = TextBuffer()
         self.render_mode = True
 
-        # Emulation state
+        self.cache = get_cache()
+        self.conversion_input = ""
+        self.conversion_input_size = 0
+        # MappedTextFile shown instead of the editor in large-file mode
+        self.large_file = None
+        self.async_bridge = AsyncEngineBridge(self) if CONVERSION_ENGINE == "async" else None
+        self.thread = None
+        self.worker = None
+        # Threads of cancelled conversions, kept alive until they have wound down
+        self.retired_threads = []
+
+        # Multi-document queue: job id -> (QThread, JobWorker) while running
+        self.scheduler = JobScheduler()
+        self.job_workers = {}
+
+        # Live stream state
         self.final_content = ""
-        self.display_buffer = ""
-        self.emulation_index = 0
-        self.emulation_timer = QTimer(self)
-        self.emulation_timer.timeout.connect(self._emulate_stream_tick)
+        self.display_buffer = TextBuffer()
+        # Created on first use or by the deferred init timer; constructing a
+        # QWebEngineView starts Chromium, which would delay the first paint
+        self.preview = None
+        self.output_web_view = None
+        self.preview_ready = False
+        self.envelope = EnvelopeParser()
+        # Clean body text parsed since the last render tick
+        self.stream_pending = TextBuffer()
+        self.conversion_failed = False
+        self.stream_render_timer = QTimer(self)
+        self.stream_render_timer.setSingleShot(True)
+        self.stream_render_timer.setInterval(STREAM_RENDER_INTERVAL_MS)
+        self.stream_render_timer.timeout.connect(self._on_stream_render_tick)
 
         main_widget = QWidget()
         self.main_layout = QVBoxLayout(main_widget)
@@ -55,10 +95,34 @@ class MainWindow(QMainWindow):
         
         self.progress_bar = QProgressBar()
         self.progress_bar.setFixedWidth(150)
-        
+
+        self.encoding_label = QLabel("")
+        self.statusBar().addPermanentWidget(self.encoding_label)
+
+        self.model_status_label = QLabel("Model: cold")
+        self.statusBar().addPermanentWidget(self.model_status_label)
+
         self.setCentralWidget(main_widget)
         self.start_pos = None
 
+        # Model warm-up and time-to-first-token bookkeeping
+        self.warmup_thread = None
+        self.warmup_worker = None
+        self.ttft_samples = []
+        self.conversion_ttft = None
+        self.conversion_metrics = None
+        self.conversion_verification = None
+        # Last conversion's segments, reused when the edited input comes back
+        self.conversion_memory = ConversionMemory()
+        self.keepalive_timer = QTimer(self)
+        self.keepalive_timer.timeout.connect(self.start_model_warmup)
+        if KEEPALIVE_PING_INTERVAL_MS > 0:
+            self.keepalive_timer.start(KEEPALIVE_PING_INTERVAL_MS)
+        QTimer.singleShot(DEFERRED_INIT_DELAY_MS, self._ensure_web_view)
+        if WARMUP_ON_START:
+            # Deferred until the event loop runs, i.e. after the window is shown
+            QTimer.singleShot(0, self.start_model_warmup)
+
     def setup_ui(self, layout):
         controls_layout = QHBoxLayout()
         controls_layout.setSpacing(6)
@@ -78,6 +142,14 @@ class MainWindow(QMainWindow):
         self.convert_button.clicked.connect(self.start_conversion_process)
         controls_layout.addWidget(self.convert_button)
 
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        self.cancel_button.setProperty("class", "SecondaryButton")
+        self.cancel_button.setToolTip("Stop the running conversion (Esc)")
+        self.cancel_button.hide()
+        controls_layout.addWidget(self.cancel_button)
+        QShortcut(QKeySequence(Qt.Key_Escape), self, activated=self.cancel_conversion)
+
         controls_layout.addStretch()
 
         self.toggle_view_button = QPushButton("View: Raw")
@@ -110,8 +182,24 @@ class MainWindow(QMainWindow):
         input_layout.addWidget(input_label)
         self.input_text = QPlainTextEdit()
         self.input_text.setPlaceholderText("Paste your text here or load a file...")
-        input_layout.addWidget(self.input_text)
-        splitter.addWidget(input_container)
+        self.large_view = LargeTextView()
+        self.input_stack = QStackedLayout()
+        self.input_stack.addWidget(self.input_text)
+        self.input_stack.addWidget(self.large_view)
+        input_layout.addLayout(self.input_stack)
+        self.queue_panel = JobQueuePanel()
+        self.queue_panel.files_added.connect(self.add_jobs)
+        self.queue_panel.job_activated.connect(self.show_job_result)
+        self.queue_panel.prioritize_requested.connect(self.prioritize_jobs)
+        self.queue_panel.remove_requested.connect(self.remove_jobs)
+        self.queue_panel.clear_finished_requested.connect(self.clear_finished_jobs)
+        self.queue_panel.save_all_requested.connect(self.save_all_jobs)
+
+        input_splitter = QSplitter(Qt.Vertical)
+        input_splitter.addWidget(input_container)
+        input_splitter.addWidget(self.queue_panel)
+        input_splitter.setSizes([500, 200])
+        splitter.addWidget(input_splitter)
 
         output_panel_container = QWidget()
         output_panel_layout = QVBoxLayout(output_panel_container)
@@ -132,12 +220,8 @@ class MainWindow(QMainWindow):
 
         self.web_view_container = QWidget()
         self.web_view_container.setObjectName("WebViewContainer")
-        web_view_layout = QVBoxLayout(self.web_view_container)
-        web_view_layout.setContentsMargins(8, 8, 8, 8)
-
-        self.output_web_view = QWebEngineView()
-        self.output_web_view.page().setBackgroundColor(Qt.GlobalColor.transparent)
-        web_view_layout.addWidget(self.output_web_view)
+        self.web_view_layout = QVBoxLayout(self.web_view_container)
+        self.web_view_layout.setContentsMargins(8, 8, 8, 8)
 
         self.output_layout.addWidget(self.web_view_container)
 
@@ -149,36 +233,76 @@ class MainWindow(QMainWindow):
 
         self._update_output_display()
 
-    def _parse_markdown_from_buffer(self, buffer_text):
-        start_tag = "<markdown>"
-        end_tag = "</markdown>"
+    def _ensure_web_view(self):
+        if self.output_web_view is not None:
+            return
+        from PySide6.QtWebEngineWidgets import QWebEngineView
+        from preview import IncrementalPreview, preview_shell_html
 
-        start_index = buffer_text.find(start_tag)
-        if start_index == -1:
-            return ""
+        self.preview = IncrementalPreview()
+        self.output_web_view = QWebEngineView()
+        self.output_web_view.page().setBackgroundColor(Qt.GlobalColor.transparent)
+        self.output_web_view.loadFinished.connect(self._on_preview_loaded)
+        self.output_web_view.setHtml(preview_shell_html(), QUrl("about:blank"))
+        self.web_view_layout.addWidget(self.output_web_view)
+
+    def _on_preview_loaded(self, ok):
+        first_load = not self.preview_ready
+        self.preview_ready = ok
+        if ok and self.render_mode:
+            self._update_output_display()
+        if ok and first_load:
+            self.interactive.emit()
 
-        content_start_index = start_index + len(start_tag)
-        end_index = buffer_text.rfind(end_tag)
-
-        if end_index == -1 or end_index < content_start_index:
-            return ""
-        else:
-            return buffer_text[content_start_index:end_index].strip()
+    def _apply_preview_patch(self, patch):
+        from preview import patch_script
+        self.output_web_view.page().runJavaScript(patch_script(patch))
 
     def _update_output_display(self):
         if self.render_mode:
             self.output_layout.setCurrentWidget(self.web_view_container)
-            html_content = markdown.markdown(self.display_buffer, extensions=['fenced_code', 'tables', 'nl2br'])
-            full_html = f'<!DOCTYPE html><html><head><meta charset="utf-8">{MARKDOWN_CSS}</head><body>{html_content}</body></html>'
-            self.output_web_view.setHtml(full_html, QUrl("about:blank"))
+            if self.display_buffer:
+                self._ensure_web_view()
+            # Until the page has loaded, text only accumulates in display_buffer;
+            # _on_preview_loaded renders it in one go
+            if self.preview_ready:
+                self._apply_preview_patch(self.preview.set_text(self.display_buffer.getvalue()))
         else:
             self.output_layout.setCurrentWidget(self.output_raw_text)
-            self.output_raw_text.setPlainText(self.display_buffer)
+            self.output_raw_text.setPlainText(self.display_buffer.getvalue())
+
+    def _append_output_display(self, delta):
+        if not delta:
+            return
+        self.display_buffer.append(delta)
+        if self.render_mode:
+            self._ensure_web_view()
+            if self.preview_ready:
+                self._apply_preview_patch(self.preview.append(delta))
+        else:
+            cursor = self.output_raw_text.textCursor()
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+            cursor.insertText(delta)
+
+    def _show_final_content(self):
+        shown = self.display_buffer.getvalue()
+        if self.final_content.startswith(shown):
+            self._append_output_display(self.final_content[len(shown):])
+        elif self.render_mode and shown.rstrip() == self.final_content:
+            # Only trailing whitespace differs, which the rendered page ignores
+            self.display_buffer = TextBuffer(self.final_content)
+        else:
+            self.display_buffer = TextBuffer(self.final_content)
+            self._update_output_display()
+        if self.render_mode and self.preview_ready:
+            self._apply_preview_patch(self.preview.finish())
 
     def clear_all(self):
+        self._close_large_file()
         self.input_text.clear()
-        self.markdown_buffer = ""
-        self.display_buffer = ""
+        self.encoding_label.setText("")
+        self.markdown_buffer.clear()
+        self.display_buffer.clear()
         self.final_content = ""
         self.copy_button.setEnabled(False)
         self.save_button.setEnabled(False)
@@ -191,7 +315,7 @@ class MainWindow(QMainWindow):
         self._update_output_display()
 
     def copy_output(self):
-        QApplication.clipboard().setText(self.markdown_buffer)
+        QApplication.clipboard().setText(self.markdown_buffer.getvalue())
         self.status_label.setText("Copied to clipboard")
         QTimer.singleShot(3000, lambda: self.status_label.setText("Ready"))
 
@@ -200,7 +324,7 @@ class MainWindow(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(self.markdown_buffer)
+                    f.write(self.markdown_buffer.getvalue())
                 self.status_label.setText(f"Saved: {os.path.basename(file_path)}")
                 QTimer.singleShot(5000, lambda: self.status_label.setText("Ready"))
             except Exception as e:
@@ -210,101 +334,316 @@ class MainWindow(QMainWindow):
         file_path, _ = QFileDialog.getOpenFileName(self, "Open Text File", "", "Text Files (*.txt);;Markdown Files (*.md);;All Files (*)")
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    self.input_text.setPlainText(f.read())
-                self.status_label.setText(f"Loaded: {os.path.basename(file_path)}")
+                # Sniffing a prefix rejects binaries before anything else is read
+                encoding = detect_encoding(file_path)
+                if os.path.getsize(file_path) >= LARGE_FILE_THRESHOLD_BYTES and is_ascii_compatible(encoding):
+                    self._open_large_file(file_path, encoding)
+                    return
+                text, encoding = read_text(file_path)
+                self._close_large_file()
+                self.input_text.setPlainText(text)
+                self.encoding_label.setText(describe_encoding(encoding))
+                self.status_label.setText(f"Loaded: {os.path.basename(file_path)} ({describe_encoding(encoding)})")
                 QTimer.singleShot(3000, lambda: self.status_label.setText("Ready"))
+            except BinaryFileError as e:
+                self.status_label.setText(f"Not a text file: {os.path.basename(file_path)} ({e})")
             except Exception as e:
                 self.status_label.setText(f"Error loading file: {e}")
 
+    def _open_large_file(self, file_path, encoding='utf-8'):
+        self._close_large_file()
+        self.large_file = MappedTextFile(file_path, encoding)
+        self.encoding_label.setText(describe_encoding(encoding))
+        self.large_view.set_document(self.large_file)
+        self.input_stack.setCurrentWidget(self.large_view)
+        self.input_text.clear()
+        self.status_label.setText(
+            f"Large file mode: {self.large_file.name} ({self.large_file.size / 1024 / 1024:.0f} MB, "
+            f"{self.large_file.line_count:,} lines, read-only). Clear to return to the editor."
+        )
+
+    def _close_large_file(self):
+        if self.large_file is None:
+            return
+        if self.worker is not None and getattr(self.worker, "source_file", None) is self.large_file:
+            self.cancel_conversion()
+        self.large_view.set_document(None)
+        self.input_stack.setCurrentWidget(self.input_text)
+        self.large_file.close()
+        self.large_file = None
+
     def start_conversion_process(self):
-        input_content = self.input_text.toPlainText()
-        if not input_content.strip():
+        large_file = self.large_file
+        # In large-file mode the text is never materialized; the worker
+        # decodes it chunk by chunk from the mapping
+        input_content = "" if large_file is not None else self.input_text.toPlainText()
+        if large_file is None and not input_content.strip():
             self.status_label.setText("Input is empty.")
             QTimer.singleShot(3000, lambda: self.status_label.setText("Ready"))
             return
 
+        cached_content = self.cache.get(input_content) if self.cache is not None and large_file is None else None
+        if cached_content is not None:
+            self.show_cached_result(cached_content)
+            return
+        self.conversion_input = input_content
+        self.conversion_input_size = large_file.size if large_file is not None else len(input_content)
+        # Only the paragraphs changed since the last conversion go to the model
+        units, reused_chars = self.conversion_memory.plan(input_content) if large_file is None else ([], 0)
+
         self.convert_button.setEnabled(False)
         self.convert_button.setText("Converting...")
+        self.cancel_button.show()
         self.copy_button.setEnabled(False)
         self.save_button.setEnabled(False)
-        self.status_label.setText("Processing with AI...")
-        
+        if reused_chars:
+            self.status_label.setText(
+                f"Converting changed paragraphs only ({reused_chars / len(input_content):.0%} reused)..."
+            )
+        else:
+            self.status_label.setText("Processing with AI...")
+
         self.statusBar().addPermanentWidget(self.progress_bar)
         self.progress_bar.show()
         self.progress_bar.setValue(0)
 
         # Reset buffers for new conversion
-        self.markdown_buffer = ""
-        self.display_buffer = ""
+        self.markdown_buffer.clear()
+        self.display_buffer.clear()
         self.final_content = ""
-        self.emulation_index = 0
+        self.envelope = EnvelopeParser()
+        self.stream_pending.clear()
+        self.conversion_failed = False
+        self.conversion_ttft = None
+        self.conversion_metrics = None
+        self.conversion_verification = None
         self._update_output_display()
 
+        if self.async_bridge is not None and large_file is None:
+            self.worker = self.async_bridge.submit(
+                input_content, self.conversion_memory, units if reused_chars else None, reused_chars
+            )
+            self._connect_worker(self.worker)
+            self.async_bridge.start(self.worker)
+            self.worker.finished.connect(self.worker.deleteLater)
+            return
+
         self.thread = QThread()
-        self.worker = ConversionWorker(input_content)
+        if reused_chars:
+            self.worker = ConversionWorker(input_content, units=units, reused_chars=reused_chars,
+                                           memory=self.conversion_memory)
+        else:
+            memory = self.conversion_memory if large_file is None else None
+            self.worker = ConversionWorker(input_content, large_file, memory=memory)
         self.worker.moveToThread(self.thread)
 
         self.thread.started.connect(self.worker.run)
-        self.worker.new_token.connect(self.append_token)
-        self.worker.progress.connect(self.update_progress)
-        self.worker.finished.connect(self.on_conversion_finished)
-        self.worker.error.connect(self.on_conversion_error)
+        self._connect_worker(self.worker)
 
         self.worker.finished.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
 
+    def _worker_connections(self, worker):
+        return (
+            (worker.new_token, self.append_token),
+            (worker.first_token, self.on_first_token),
+            (worker.metrics, self.on_conversion_metrics),
+            (worker.verified, self.on_conversion_verified),
+            (worker.progress, self.update_progress),
+            (worker.finished, self.on_conversion_finished),
+            (worker.error, self.on_conversion_error),
+        )
+
+    def _connect_worker(self, worker):
+        for signal, slot in self._worker_connections(worker):
+            signal.connect(slot)
+
+    def cancel_conversion(self):
+        if self.worker is None or self.convert_button.isEnabled():
+            return
+        worker = self.worker
+        self.worker = None
+        # Signals already queued from the worker are dropped with the connections
+        for signal, slot in self._worker_connections(worker):
+            signal.disconnect(slot)
+
+        # Large files run on a ConversionWorker thread even with the async engine
+        if isinstance(worker, AsyncConversionJob):
+            self.async_bridge.cancel(worker)
+        else:
+            worker.cancel()
+            thread = self.thread
+            self.thread = None
+            self.retired_threads.append(thread)
+            thread.finished.connect(lambda: self.retired_threads.remove(thread))
+
+        self.conversion_failed = True
+        # Show what had arrived; the output pane keeps the partial result
+        self._on_stream_render_tick()
+        self.stream_render_timer.stop()
+        self.status_label.setText("Conversion cancelled.")
+        self.reset_convert_button()
+        QTimer.singleShot(3000, lambda: self.status_label.setText("Ready"))
+
+    def _present_content(self, content):
+        self.markdown_buffer = TextBuffer(content)
+        self.final_content = content
+        self.display_buffer = TextBuffer(content)
+        self._update_output_display()
+
+        self.copy_button.setEnabled(True)
+        self.save_button.setEnabled(True)
+
+    def show_cached_result(self, content):
+        self._present_content(content)
+        self.status_label.setText(f"Conversion complete (cache hit; {self.cache.describe()}).")
+        QTimer.singleShot(5000, lambda: self.status_label.setText("Ready"))
+
     def append_token(self, token):
-        self.markdown_buffer += token
+        self.markdown_buffer.append(token)
 
-    def update_progress(self, value):
+        was_opened = self.envelope.opened
+        self.stream_pending.append(self.envelope.feed(token))
+
+        if not self.envelope.opened:
+            if not self.envelope.compliant:
+                self.status_label.setText("Model output has no <markdown> tag yet...")
+            return
+        if not was_opened:
+            self.status_label.setText("Streaming output...")
+
+        # Leading-edge throttle: the first visible token renders immediately,
+        # later ones are batched until the render timer fires.
+        if not self.stream_render_timer.isActive():
+            self._on_stream_render_tick()
+
+    def _on_stream_render_tick(self):
+        if not self.stream_pending:
+            return
+        pending = self.stream_pending.getvalue()
+        self.stream_pending.clear()
+        self._append_output_display(pending)
+        self.stream_render_timer.start()
+
+    def start_model_warmup(self):
+        # Skipped while a conversion is running: it keeps the model loaded anyway
+        if self.warmup_thread is not None or not self.convert_button.isEnabled():
+            return
+        if not self.model_status_label.text().startswith("Model: warm"):
+            self.model_status_label.setText("Model: warming up...")
+
+        self.warmup_thread = QThread()
+        self.warmup_worker = WarmupWorker()
+        self.warmup_worker.moveToThread(self.warmup_thread)
+        self.warmup_thread.started.connect(self.warmup_worker.run)
+        self.warmup_worker.finished.connect(self.on_warmup_finished)
+        self.warmup_worker.finished.connect(self.warmup_thread.quit)
+        self.warmup_worker.finished.connect(self.warmup_worker.deleteLater)
+        self.warmup_thread.finished.connect(self.warmup_thread.deleteLater)
+        # References are dropped only once the thread has stopped: a running
+        # QThread must not be destroyed
+        self.warmup_thread.finished.connect(self.on_warmup_thread_finished)
+        self.warmup_thread.start()
+
+    def on_warmup_thread_finished(self):
+        self.warmup_thread = None
+        self.warmup_worker = None
+
+    def on_warmup_finished(self, ok, load_seconds, error_message):
+        if not ok:
+            self.model_status_label.setText("Model: unavailable")
+            self.model_status_label.setToolTip(error_message)
+            return
+        if load_seconds >= 0.05:
+            self.model_status_label.setText(f"Model: warm (loaded in {load_seconds:.1f}s)")
+        else:
+            self.model_status_label.setText("Model: warm")
+        self._update_ttft_tooltip()
+
+    def on_first_token(self, seconds):
+        self.conversion_ttft = seconds
+        self.ttft_samples.append(seconds)
+        self.model_status_label.setText("Model: warm")
+        self._update_ttft_tooltip()
+
+    def _update_ttft_tooltip(self):
+        if not self.ttft_samples:
+            self.model_status_label.setToolTip("")
+            return
+        tooltip = f"Time to first token, first conversion: {self.ttft_samples[0]:.2f}s"
+        later = self.ttft_samples[1:]
+        if later:
+            tooltip += f"\nLater conversions: {sum(later) / len(later):.2f}s average over {len(later)}"
+        self.model_status_label.setToolTip(tooltip)
+
+    def on_conversion_metrics(self, timer):
+        # Arrives just before `finished`; the record is completed there
+        self.conversion_metrics = timer
+
+    def on_conversion_verified(self, report, content):
+        # Also arrives before `finished`, with the repaired output if any
+        # segment had to be re-requested
+        self.conversion_verification = (report, content)
+
+    def _record_metrics(self, parsed):
+        if self.conversion_metrics is None:
+            return ""
+        record = self.conversion_metrics.record(
+            render_done_at=time.perf_counter(),
+            mode="gui",
+            engine=CONVERSION_ENGINE,
+            input_chars=self.conversion_input_size,
+            output_chars=len(self.final_content),
+            parsed=parsed,
+        )
+        append_record(record)
+        return format_summary(record)
+
+    def update_progress(self, value, eta):
         self.progress_bar.setValue(value)
+        if value >= 100 or self.conversion_failed or not self.envelope.compliant:
+            return
+        eta_note = format_eta(eta if eta >= 0 else None)
+        self.status_label.setText(f"Converting... {value}%" + (f" ({eta_note})" if eta_note else ""))
 
     def on_conversion_finished(self):
-        raw_output = self.markdown_buffer
-        self.final_content = self._parse_markdown_from_buffer(raw_output)
-        
-        parsed_successfully = bool(self.final_content)
+        if self.conversion_failed:
+            return
 
-        if not parsed_successfully:
-            # Fallback: use the raw output if parsing fails
-            self.final_content = raw_output.strip()
-            self.status_label.setText("Parsing failed, showing raw output.")
-        else:
-            self.status_label.setText("Conversion complete. Rendering...")
+        # Everything the parser produced is now in display_buffer
+        self._on_stream_render_tick()
+        self.stream_render_timer.stop()
+        self.final_content, parsed_successfully = self.envelope.result(
+            self.display_buffer.getvalue(), self.markdown_buffer.getvalue()
+        )
+        verified = True
+        if self.conversion_verification is not None:
+            report, content = self.conversion_verification
+            if report.retried:
+                self.final_content = content
+            verified = report.ok
+
+        if parsed_successfully and verified and self.cache is not None and self.conversion_input:
+            self.cache.put(self.conversion_input, self.final_content)
 
         # The final, clean content is now also stored in markdown_buffer for copy/save
-        self.markdown_buffer = self.final_content
-
-        if self.final_content:
-            self.emulation_timer.start(5)  # Start emulated streaming
-        else: # Handle case where there is no output at all
-            self.on_emulation_finished(parsed_successfully)
+        self.markdown_buffer = TextBuffer(self.final_content)
 
+        self._show_final_content()
 
-    def _emulate_stream_tick(self):
-        if self.emulation_index < len(self.final_content):
-            # Add a small chunk of characters to make streaming feel smooth
-            chunk_size = max(1, len(self.final_content) // 200) # Adjust chunk size based on content length
-            chunk = self.final_content[self.emulation_index : self.emulation_index + chunk_size]
-            self.display_buffer += chunk
-            self.emulation_index += chunk_size
-            self._update_output_display()
+        summary = self._record_metrics(parsed_successfully)
+        if summary:
+            note = f" {summary}"
+        elif self.conversion_ttft is not None:
+            note = f" First token after {self.conversion_ttft:.2f}s."
         else:
-            self.emulation_timer.stop()
-            self.on_emulation_finished(True)
-    
-    def on_emulation_finished(self, parsed_successfully):
-        # Final update to ensure the last chunk is rendered
-        self.display_buffer = self.final_content
-        self._update_output_display()
-        
+            note = ""
         if parsed_successfully:
-            self.status_label.setText("Conversion complete.")
+            self.status_label.setText(f"Conversion complete.{note}")
         else:
-            self.status_label.setText("Conversion complete (parsing tags failed).")
+            self.status_label.setText(f"Conversion complete (parsing tags failed).{note}")
 
         self.copy_button.setEnabled(True)
         self.save_button.setEnabled(True)
@@ -312,7 +651,9 @@ class MainWindow(QMainWindow):
         QTimer.singleShot(5000, lambda: self.status_label.setText("Ready"))
 
     def on_conversion_error(self, error_message):
-        self.display_buffer = f"An error occurred:\n\n{error_message}"
+        self.conversion_failed = True
+        self.stream_render_timer.stop()
+        self.display_buffer = TextBuffer(f"An error occurred:\n\n{error_message}")
         if self.render_mode:
             # If we're in render mode and an error occurs, the error message
             # likely contains newlines that won't show. Switch to raw view
@@ -328,5 +669,142 @@ class MainWindow(QMainWindow):
     def reset_convert_button(self):
         self.convert_button.setEnabled(True)
         self.convert_button.setText("Convert to Markdown")
+        self.cancel_button.hide()
         if self.progress_bar.parent():
-            self.statusBar().removeWidget(self.progress_bar)
\ No newline at end of file
+            self.statusBar().removeWidget(self.progress_bar)
+
+    # --- Multi-document queue ---
+
+    def add_jobs(self, paths):
+        files = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(
+                        os.path.join(root, name) for name in sorted(names)
+                        if name.lower().endswith(BATCH_EXTENSIONS)
+                    )
+            elif os.path.isfile(path):
+                files.append(path)
+        for path in files:
+            self.queue_panel.add_job(self.scheduler.add(Job(path)))
+        self._dispatch_jobs()
+
+    def _dispatch_jobs(self):
+        for job in self.scheduler.next_jobs():
+            self.queue_panel.update_job(job)
+            thread = QThread()
+            worker = JobWorker(job.id, job.path, self.cache)
+            worker.moveToThread(thread)
+            thread.started.connect(worker.run)
+            worker.progress.connect(self.on_job_progress)
+            worker.succeeded.connect(self.on_job_succeeded)
+            worker.failed.connect(self.on_job_failed)
+            worker.cancelled.connect(self.on_job_cancelled)
+            worker.finished.connect(thread.quit)
+            worker.finished.connect(worker.deleteLater)
+            thread.finished.connect(thread.deleteLater)
+            thread.finished.connect(lambda job_id=job.id: self.job_workers.pop(job_id, None))
+            self.job_workers[job.id] = (thread, worker)
+            thread.start()
+
+    def on_job_progress(self, job_id, percent):
+        job = self.scheduler.jobs.get(job_id)
+        if job is not None:
+            job.progress = percent
+            self.queue_panel.update_job(job)
+
+    def _finish_job(self, job_id, status):
+        job = self.scheduler.finish(job_id, status)
+        self.queue_panel.update_job(job)
+        self._dispatch_jobs()
+        return job
+
+    def on_job_succeeded(self, job_id, result):
+        job = self.scheduler.jobs[job_id]
+        job.content = result.content
+        job.parsed = result.parsed
+        job.cached = result.cached
+        if result.metrics is not None:
+            append_record(result.metrics.record(
+                mode="queue", input_chars=job.size, output_chars=len(result.content), parsed=result.parsed
+            ))
+        self._finish_job(job_id, DONE)
+
+    def on_job_failed(self, job_id, error_message):
+        self.scheduler.jobs[job_id].error = error_message
+        self._finish_job(job_id, FAILED)
+
+    def on_job_cancelled(self, job_id):
+        self._finish_job(job_id, CANCELLED)
+
+    def show_job_result(self, job_id):
+        job = self.scheduler.jobs.get(job_id)
+        if job is None:
+            return
+        if job.status == FAILED:
+            self.status_label.setText(f"{job.name} failed: {job.error.splitlines()[0]}")
+            return
+        if job.status != DONE:
+            return
+        if not self.convert_button.isEnabled():
+            self.status_label.setText("Wait for the current conversion to finish before viewing a queued result.")
+            return
+        self._present_content(job.content)
+        note = "" if job.parsed else " (parsing tags failed)"
+        self.status_label.setText(f"Showing {job.name}{note}.")
+
+    def prioritize_jobs(self, job_ids):
+        for job_id in job_ids:
+            self.scheduler.prioritize(job_id)
+        for job in self.scheduler.jobs.values():
+            self.queue_panel.update_job(job)
+
+    def remove_jobs(self, job_ids):
+        removed = []
+        for job_id in job_ids:
+            job = self.scheduler.jobs.get(job_id)
+            if job is None:
+                continue
+            if job.status == RUNNING:
+                # Stays listed as Cancelled once the worker has stopped
+                self.job_workers[job_id][1].cancel()
+            else:
+                self.scheduler.remove(job_id)
+                removed.append(job_id)
+        self.queue_panel.remove_jobs(removed)
+
+    def clear_finished_jobs(self):
+        self.queue_panel.remove_jobs(self.scheduler.clear_finished())
+
+    def save_all_jobs(self):
+        done = [job for job in self.scheduler.jobs.values() if job.status == DONE]
+        if not done:
+            self.status_label.setText("No finished documents to save.")
+            return
+        directory = QFileDialog.getExistingDirectory(self, "Save All Converted Documents")
+        if not directory:
+            return
+        taken = set()
+        try:
+            for job in done:
+                with open(unique_output_path(directory, job.name, taken), 'w', encoding='utf-8') as f:
+                    f.write(job.content)
+            self.status_label.setText(f"Saved {len(done)} documents to {directory}")
+            QTimer.singleShot(5000, lambda: self.status_label.setText("Ready"))
+        except Exception as e:
+            self.status_label.setText(f"Error saving files: {e}")
+
+    def closeEvent(self, event):
+        self.cancel_conversion()
+        for thread, worker in list(self.job_workers.values()):
+            worker.cancel()
+            thread.wait(2000)
+        for thread in list(self.retired_threads):
+            thread.wait(2000)
+        if self.warmup_thread is not None:
+            self.warmup_thread.quit()
+            self.warmup_thread.wait(2000)
+        if self.async_bridge is not None:
+            self.async_bridge.shutdown()
+        super().closeEvent(event)
\ No newline at end of file
@@ -0,0 +1,147 @@
+import json
+import os
+import platform
+import threading
+import time
+
+from config import MODEL_NAME, METRICS_LOG_ENABLED, METRICS_LOG_PATH
+from progress import estimate_tokens
+
+# ==============================================================================
+# 14. PER-CONVERSION PERFORMANCE METRICS
+# ==============================================================================
+
+# Reported by Ollama on the final (done) chunk; durations are nanoseconds
+SERVER_FIELDS = (
+    "total_duration", "load_duration", "prompt_eval_count",
+    "prompt_eval_duration", "eval_count", "eval_duration",
+)
+
+
+class StreamTimer:
+    # Client-side timeline of one conversion plus the server statistics
+    # from every final chunk it saw. Chunked conversions merge the timers
+    # of their pieces, which sums the server fields.
+    def __init__(self):
+        self.request_sent = time.time()
+        self.started_at = time.perf_counter()
+        self.first_token_at = None
+        self.last_token_at = None
+        self.requests = 0
+        self.server = {}
+        # Input characters covered, and how many of them the fast path handled
+        self.input_chars = 0
+        self.fast_path_chars = 0
+        # verifier.Verification.summary() of the finished document
+        self.verification = None
+        # Input characters whose output was reused from the previous run
+        self.reused_chars = 0
+
+    def observe(self, chunk):
+        # Returns True when this chunk carried the first visible token
+        first = False
+        if chunk.get('response'):
+            now = time.perf_counter()
+            if self.first_token_at is None:
+                self.first_token_at = now
+                first = True
+            self.last_token_at = now
+        if chunk.get('done'):
+            self.requests += 1
+            for field in SERVER_FIELDS:
+                value = chunk.get(field)
+                if value:
+                    self.server[field] = self.server.get(field, 0) + value
+        return first
+
+    def merge(self, other):
+        if other is None:
+            return
+        for name, pick in (("first_token_at", min), ("last_token_at", max)):
+            values = [value for value in (getattr(self, name), getattr(other, name)) if value is not None]
+            setattr(self, name, pick(values) if values else None)
+        self.requests += other.requests
+        self.input_chars += other.input_chars
+        self.fast_path_chars += other.fast_path_chars
+        for field, value in other.server.items():
+            self.server[field] = self.server.get(field, 0) + value
+
+    @property
+    def ttft(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    def record(self, render_done_at=None, **extra):
+        def since_start(moment):
+            return round(moment - self.started_at, 4) if moment is not None else None
+
+        eval_seconds = self.server.get("eval_duration", 0) / 1e9
+        record = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.request_sent)),
+            "machine": platform.node(),
+            "model": MODEL_NAME,
+            "requests": self.requests,
+            "client": {
+                "request_sent": self.request_sent,
+                "first_token_s": since_start(self.first_token_at),
+                "last_token_s": since_start(self.last_token_at),
+                "render_done_s": since_start(render_done_at),
+            },
+            "server": dict(self.server),
+            "eval_tokens_per_s": round(self.server["eval_count"] / eval_seconds, 2) if eval_seconds else None,
+            "fast_path": {
+                "chars": self.fast_path_chars,
+                "input_chars": self.input_chars,
+                "fraction": round(self.fast_path_chars / self.input_chars, 4) if self.input_chars else 0.0,
+                "tokens_saved_est": estimate_tokens(self.fast_path_chars),
+            },
+            "verification": self.verification,
+            "reused_chars": self.reused_chars,
+        }
+        record.update(extra)
+        return record
+
+
+def format_summary(record):
+    parts = []
+    eval_count = record["server"].get("eval_count")
+    if eval_count:
+        parts.append(f"{eval_count} tok")
+    if record.get("eval_tokens_per_s"):
+        parts.append(f"{record['eval_tokens_per_s']:.1f} tok/s")
+    if record["client"].get("first_token_s") is not None:
+        parts.append(f"TTFT {record['client']['first_token_s']:.2f}s")
+    load_seconds = record["server"].get("load_duration", 0) / 1e9
+    if load_seconds >= 0.05:
+        parts.append(f"load {load_seconds:.1f}s")
+    fast_path = record.get("fast_path") or {}
+    if fast_path.get("fraction"):
+        parts.append(f"{fast_path['fraction']:.0%} rule-based")
+    if record.get("reused_chars") and fast_path.get("input_chars"):
+        parts.append(f"{record['reused_chars'] / fast_path['input_chars']:.0%} reused")
+    verification = record.get("verification")
+    if verification:
+        retried = f", {verification['retried_segments']} re-requested" if verification["retried_segments"] else ""
+        if verification["dropped"] or verification["extra"]:
+            parts.append(f"{verification['dropped']} words missing/{verification['extra']} added{retried}")
+        else:
+            parts.append(f"verified{retried}")
+    return " | ".join(parts)
+
+
+_log_lock = threading.Lock()
+
+
+def append_record(record, path=METRICS_LOG_PATH):
+    if not METRICS_LOG_ENABLED:
+        return
+    line = json.dumps(record, sort_keys=True) + "\n"
+    try:
+        with _log_lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line)
+    except OSError:
+        # Metrics must never break a conversion
+        pass
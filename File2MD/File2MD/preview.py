@@ -0,0 +1,299 @@
+import json
+import re
+from html import escape as html_escape
+
+import markdown
+
+from config import MARKDOWN_CSS
+
+# ==============================================================================
+# 10. INCREMENTAL RENDERED PREVIEW
+# ==============================================================================
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables', 'nl2br']
+
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+LIST_ITEM_PATTERN = re.compile(r"^\s*([-*+]|\d+[.)])\s")
+LIST_HTML_PATTERN = re.compile(r"^\s*<(ul|ol)[^>]*>(.*)</\1>\s*$", re.DOTALL)
+
+# The page is loaded once; afterwards only the blocks that changed are
+# replaced. Blocks from `start` onward are dropped and re-appended, and an
+# open list or code block is extended in place.
+PREVIEW_SCRIPT = """
+<script>
+window.f2mdPatch = function (start, blocks) {
+    var root = document.getElementById('f2md-root');
+    var doc = document.documentElement;
+    var stick = window.innerHeight + window.scrollY >= doc.scrollHeight - 8;
+    while (root.children.length > start) {
+        root.removeChild(root.lastElementChild);
+    }
+    for (var i = 0; i < blocks.length; i++) {
+        var block = document.createElement('div');
+        block.innerHTML = blocks[i];
+        root.appendChild(block);
+    }
+    if (stick) {
+        window.scrollTo(0, doc.scrollHeight);
+    }
+};
+// Appends finished items or code lines to the open list or <pre> element
+// of block `index`, replacing its unfinished tail
+window.f2mdExtend = function (index, html, tail) {
+    var root = document.getElementById('f2md-root');
+    var doc = document.documentElement;
+    var stick = window.innerHeight + window.scrollY >= doc.scrollHeight - 8;
+    var open = root.children[index].querySelector('[data-f2md-open]');
+    var last = open.lastElementChild;
+    if (last && last.hasAttribute('data-f2md-tail')) {
+        open.removeChild(last);
+    }
+    open.insertAdjacentHTML('beforeend', html + tail);
+    if (stick) {
+        window.scrollTo(0, doc.scrollHeight);
+    }
+};
+</script>
+"""
+
+
+def preview_shell_html():
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8">{MARKDOWN_CSS}{PREVIEW_SCRIPT}</head>'
+        f'<body><div id="f2md-root"></div></body></html>'
+    )
+
+
+def split_blocks(text):
+    # Top-level blocks separated by blank lines, as (offset, source) pairs.
+    # Fenced code is kept whole, and indented continuations or further list
+    # items are merged into the preceding list so loose lists still render
+    # as a single list.
+    blocks = []
+    block_start = None
+    block_end = 0
+    first_line = ""
+    in_fence = False
+    saw_blank = False
+    offset = 0
+
+    for line in text.split("\n"):
+        line_start = offset
+        offset += len(line) + 1
+
+        if in_fence:
+            block_end = line_start + len(line)
+            if FENCE_PATTERN.match(line):
+                in_fence = False
+            continue
+
+        if not line.strip():
+            if block_start is not None:
+                saw_blank = True
+            continue
+
+        if saw_blank:
+            continues_list = (
+                LIST_ITEM_PATTERN.match(first_line)
+                and (line[:1] in (" ", "\t") or LIST_ITEM_PATTERN.match(line))
+            )
+            if not continues_list:
+                blocks.append((block_start, text[block_start:block_end]))
+                block_start = None
+            saw_blank = False
+
+        if block_start is None:
+            block_start = line_start
+            first_line = line
+        block_end = line_start + len(line)
+        if FENCE_PATTERN.match(line):
+            in_fence = True
+
+    if block_start is not None:
+        blocks.append((block_start, text[block_start:block_end]))
+    return blocks
+
+
+class IncrementalPreview:
+    # Tracks which blocks are already in the page and scans only the new
+    # text, line by line. A block is rendered once, when it is final; until
+    # then the open block is re-rendered on each update, except a list or
+    # fenced code block: their finished items and lines are appended to the
+    # open <ul>/<ol>/<pre> element and only the unfinished one is re-sent,
+    # so each update costs proportional to the new content, not the document.
+    def __init__(self):
+        self._md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+        self._committed_count = 0
+        self._reset_block()
+        self._partial = ""
+
+    def _render(self, source):
+        html = self._md.convert(source)
+        self._md.reset()
+        return html
+
+    def _reset_block(self):
+        # The open (last) block: its complete lines, and for a list the line
+        # index where each top-level item starts
+        self._lines = []
+        self._first_line = ""
+        self._kind = None
+        self._in_fence = False
+        self._saw_blank = False
+        self._item_starts = []
+        self._list_indent = 0
+        # Items or code lines already inside the page's open element; None
+        # while the page has no open element for this block
+        self._sent = None
+
+    def set_text(self, text):
+        self._committed_count = 0
+        self._reset_block()
+        self._partial = ""
+        return self.append(text)
+
+    def append(self, delta):
+        start = self._committed_count
+        finals = []
+        lines = (self._partial + delta).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._add_line(line, finals)
+
+        if self._kind is not None and self._sent is not None and not finals:
+            # The open element is in the page: extend it, and replace only
+            # what follows it
+            extend_html, tail_html, provisional = self._render_open_parts()
+            return (self._committed_count + 1, provisional, (self._committed_count, extend_html, tail_html))
+        return (start, finals + self._render_open(), None)
+
+    # --- Line scanning (the rules of split_blocks, one line at a time) ---
+
+    def _add_line(self, line, finals):
+        if self._in_fence:
+            self._lines.append(line)
+            if FENCE_PATTERN.match(line):
+                self._in_fence = False
+            return
+
+        if not line.strip():
+            if self._lines:
+                self._saw_blank = True
+                self._lines.append(line)
+            return
+
+        if self._saw_blank:
+            continues_list = (
+                LIST_ITEM_PATTERN.match(self._first_line)
+                and (line[:1] in (" ", "\t") or LIST_ITEM_PATTERN.match(line))
+            )
+            if not continues_list:
+                finals.append(self._finish_block())
+            self._saw_blank = False
+
+        if not self._lines:
+            self._first_line = line
+            if FENCE_PATTERN.match(line):
+                self._kind = "fence"
+            elif LIST_ITEM_PATTERN.match(line):
+                self._kind = "list"
+                self._list_indent = len(line) - len(line.lstrip())
+                self._item_starts = [0]
+        elif self._kind == "fence":
+            # Text straight after the closing fence joins the block
+            self._kind = None
+            self._sent = None
+        elif self._kind == "list" and LIST_ITEM_PATTERN.match(line) and \
+                len(line) - len(line.lstrip()) <= self._list_indent:
+            self._item_starts.append(len(self._lines))
+        self._lines.append(line)
+        if FENCE_PATTERN.match(line):
+            self._in_fence = True
+
+    def _block_source(self):
+        lines = self._lines
+        end = len(lines)
+        while end and not lines[end - 1].strip():
+            end -= 1
+        return "\n".join(lines[:end])
+
+    def _finish_block(self):
+        html = self._render(self._block_source())
+        self._committed_count += 1
+        self._reset_block()
+        return html
+
+    # --- Rendering the open block ---
+
+    def finish(self):
+        # The stream has ended: the open block (whose list or code element
+        # was built piecewise) is rendered properly, once
+        self._sent = None
+        return (self._committed_count, self._render_tail(), None)
+
+    def _render_tail(self):
+        text = "\n".join(self._lines + [self._partial]) if self._lines else self._partial
+        return [self._render(source) for _offset, source in split_blocks(text)]
+
+    def _render_open(self):
+        # The whole open block (plus the partial line) as new page blocks
+        if self._kind is None:
+            return self._render_tail()
+        self._sent = 0
+        extend_html, tail_html, provisional = self._render_open_parts()
+        if self._kind == "fence":
+            language = self._first_line.strip()[3:].strip()
+            attributes = f' class="language-{html_escape(language)}"' if language else ""
+            opening, closing = f"<pre><code{attributes} data-f2md-open>", "</code></pre>"
+        else:
+            tag = "ol" if LIST_ITEM_PATTERN.match(self._first_line).group(1)[0].isdigit() else "ul"
+            opening, closing = f"<{tag} data-f2md-open>", f"</{tag}>"
+        return [opening + extend_html + tail_html + closing] + provisional
+
+    def _render_open_parts(self):
+        # (finished items or lines not yet in the open element, the
+        # unfinished tail, blocks shown after the open element)
+        partial = self._partial
+        provisional = []
+        if self._kind == "fence":
+            code_lines = self._lines[1:] if self._in_fence else self._lines[1:-1]
+            extend_html = "".join(html_escape(line) + "\n" for line in code_lines[self._sent:])
+            self._sent = len(code_lines)
+            tail_html = ""
+            if partial and self._in_fence:
+                tail_html = f"<span data-f2md-tail>{html_escape(partial)}</span>"
+            elif partial.strip():
+                provisional.append(self._render(partial))
+            return extend_html, tail_html, provisional
+
+        starts = self._item_starts
+        finished = len(starts) - 1
+        extend_html = "".join(
+            _list_items_html(self._render("\n".join(self._lines[starts[index]:starts[index + 1]])))
+            for index in range(self._sent, finished)
+        )
+        self._sent = finished
+        tail_lines = self._lines[starts[-1]:]
+        if partial.strip():
+            if not self._saw_blank or partial[:1] in (" ", "\t") or LIST_ITEM_PATTERN.match(partial):
+                tail_lines = tail_lines + [partial]
+            else:
+                provisional.append(self._render(partial))
+        tail_items = _list_items_html(self._render("\n".join(tail_lines)))
+        tail_html = f"<div data-f2md-tail>{tail_items}</div>"
+        return extend_html, tail_html, provisional
+
+
+def _list_items_html(html):
+    # The <li> elements of a rendered single-item list
+    match = LIST_HTML_PATTERN.match(html)
+    return match.group(2) if match else html
+
+
+def patch_script(patch):
+    start, blocks, extend = patch
+    script = f"window.f2mdPatch({start}, {json.dumps(blocks)});"
+    if extend is not None:
+        index, html, tail = extend
+        script = f"window.f2mdExtend({index}, {json.dumps(html)}, {json.dumps(tail)});" + script
+    return script
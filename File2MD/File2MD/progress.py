@@ -0,0 +1,88 @@
+import threading
+import time
+
+from config import PROGRESS_CHARS_PER_TOKEN, PROGRESS_OUTPUT_RATIO, PROGRESS_REPORT_INTERVAL_MS
+
+# ==============================================================================
+# 15. PROGRESS ESTIMATION
+# ==============================================================================
+
+# Envelope tags and the newlines around them
+ENVELOPE_TOKENS = 8
+
+
+def estimate_tokens(char_count):
+    return int(char_count / PROGRESS_CHARS_PER_TOKEN)
+
+
+def estimate_output_tokens(char_count):
+    # The output is a near 1:1 restructuring of the input, plus markdown
+    # syntax and the envelope
+    return max(1, int(estimate_tokens(char_count) * PROGRESS_OUTPUT_RATIO) + ENVELOPE_TOKENS)
+
+
+class ProgressTracker:
+    # Expected versus received output tokens for one conversion or for a
+    # whole workload (chunks of a document, documents of a batch). Tokens
+    # may be added from several threads. When a piece finishes, complete()
+    # swaps its estimate for the real count so the total converges.
+    def __init__(self, expected_tokens=0, report_interval_ms=PROGRESS_REPORT_INTERVAL_MS):
+        self.expected = expected_tokens
+        self.received = 0
+        self.report_interval = report_interval_ms / 1000.0
+        self._first_token_at = None
+        self._last_report = (None, 0.0)
+        self._lock = threading.Lock()
+
+    def add_expected(self, tokens):
+        with self._lock:
+            self.expected += tokens
+
+    def add(self, tokens=1):
+        with self._lock:
+            if self._first_token_at is None:
+                self._first_token_at = time.perf_counter()
+            self.received += tokens
+
+    def complete(self, estimated, actual):
+        with self._lock:
+            self.expected += actual - estimated
+
+    def snapshot(self):
+        # (percent, eta seconds or None); stays below 100 until the caller
+        # reports completion itself
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        if self.expected <= 0:
+            return 0, None
+        percent = min(99, self.received * 100 // self.expected)
+        if self._first_token_at is None or self.received >= self.expected:
+            return percent, None
+        elapsed = time.perf_counter() - self._first_token_at
+        if elapsed <= 0:
+            return percent, None
+        rate = self.received / elapsed
+        return percent, (self.expected - self.received) / rate
+
+    def report(self):
+        # Returns a snapshot when the percentage changed or the report
+        # interval has passed since the last one, otherwise None
+        with self._lock:
+            percent, eta = self._snapshot()
+            last_percent, last_time = self._last_report
+            now = time.perf_counter()
+            if percent == last_percent and now - last_time < self.report_interval:
+                return None
+            self._last_report = (percent, now)
+            return percent, eta
+
+
+def format_eta(seconds):
+    if seconds is None or seconds < 0:
+        return ""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"~{seconds}s left"
+    return f"~{seconds // 60}m {seconds % 60:02d}s left"
@@ -0,0 +1,418 @@
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from config import (
+    CHUNK_MAX_CHARS, SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_QUEUE_LIMIT, SERVER_MAX_BODY_BYTES,
+    SERVER_KEEPALIVE_S, SERVER_METRICS_WINDOW
+)
+from converter import (
+    convert_document, describe_error, CancelToken, ConversionCancelled, ConversionResult, TokenCoalescer
+)
+from envelope import EnvelopeParser
+from fast_path import plan_units, needs_single_request
+from progress import ProgressTracker, estimate_output_tokens
+from cache import get_cache
+from metrics import append_record
+
+# ==============================================================================
+# 24. HTTP SERVICE MODE (python -m File2MD serve ...)
+# ==============================================================================
+
+# POST /convert          text in (raw body, or JSON {"text": ...}), JSON result out
+# POST /convert/stream   the same as Server-Sent Events: "token" events carry
+#                        markdown as it is generated, "progress" events the
+#                        percentage and ETA, and a final "done" (the result,
+#                        whose markdown is authoritative: verification may
+#                        have repaired segments) or "error" event. A POST to
+#                        /convert with "Accept: text/event-stream" streams too.
+# GET  /metrics          queue depth, latency percentiles and tokens/s
+# GET  /health
+
+
+class ServiceBusy(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Conversion queue is full")
+        self.retry_after = retry_after
+
+
+def percentiles(values, points=(50, 90, 99)):
+    # Nearest-rank percentiles of an unsorted list
+    if not values:
+        return {f"p{point}": None for point in points}
+    ordered = sorted(values)
+    return {
+        f"p{point}": round(ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)], 4)
+        for point in points
+    }
+
+
+class ServiceMetrics:
+    # Counters since start plus the last SERVER_METRICS_WINDOW finished
+    # conversions, as (finished at, queue wait, latency, ttft, tokens)
+    def __init__(self, window=SERVER_METRICS_WINDOW):
+        self.started_at = time.monotonic()
+        self.counts = {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0, "cached": 0}
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def observe(self, wait, latency, ttft, tokens):
+        with self._lock:
+            self.recent.append((time.monotonic(), wait, latency, ttft, tokens))
+
+    def median_latency(self):
+        with self._lock:
+            latencies = [sample[2] for sample in self.recent]
+        return percentiles(latencies, (50,))["p50"]
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            counts = dict(self.counts)
+            recent = list(self.recent)
+        # Throughput over the last minute; per-request stream rates below
+        last_minute = [sample for sample in recent if now - sample[0] <= 60]
+        span = min(60.0, now - self.started_at)
+        return {
+            "uptime_s": round(now - self.started_at, 1),
+            "requests": counts,
+            "queue_wait_s": percentiles([sample[1] for sample in recent]),
+            "latency_s": percentiles([sample[2] for sample in recent]),
+            "ttft_s": percentiles([sample[3] for sample in recent if sample[3] is not None]),
+            "tokens_per_s": round(sum(sample[4] for sample in last_minute) / span, 2) if span > 0 else 0.0,
+            "request_tokens_per_s": percentiles(
+                [sample[4] / sample[2] for sample in recent if sample[4] and sample[2] > 0]
+            ),
+        }
+
+
+class ConversionService:
+    # A fixed pool of SERVER_WORKERS conversions in front of a queue of at
+    # most `queue_limit`; a request arriving when the queue is full is
+    # refused at once (ServiceBusy) instead of waiting unboundedly.
+    def __init__(self, workers=SERVER_WORKERS, queue_limit=SERVER_QUEUE_LIMIT, use_cache=True):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self.cache = get_cache() if use_cache else None
+        self.metrics = ServiceMetrics()
+        self.queued = 0
+        self.running = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="convert")
+        self._lock = threading.Lock()
+
+    def retry_after(self):
+        # Seconds until a queue slot is likely free: the queue drains at
+        # `workers` conversions per median latency
+        latency = self.metrics.median_latency() or 1.0
+        return max(1, math.ceil(latency * (self.queued + 1) / self.workers))
+
+    def submit(self, text, emit=None, cancel=None):
+        # Returns a future for the ConversionResult. `emit(event, data)` is
+        # called from the worker thread for streamed requests.
+        cancel = cancel or CancelToken()
+        with self._lock:
+            if self.queued + self.running >= self.workers + self.queue_limit:
+                self.metrics.count("rejected")
+                raise ServiceBusy(self.retry_after())
+            self.queued += 1
+        self.metrics.count("accepted")
+        future = self._executor.submit(self._run, text, emit, cancel, time.perf_counter())
+        future.add_done_callback(self._unqueue_cancelled)
+        return future
+
+    def _unqueue_cancelled(self, future):
+        # Cancelled before a worker picked it up: _run never decremented it
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+            self.metrics.count("cancelled")
+
+    def _run(self, text, emit, cancel, submitted_at):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        wait = time.perf_counter() - submitted_at
+        try:
+            result = self._convert(text, emit, cancel)
+        except ConversionCancelled:
+            self.metrics.count("cancelled")
+            raise
+        except Exception:
+            self.metrics.count("failed")
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+
+        self.metrics.count("cached" if result.cached else "completed")
+        ttft = result.metrics.ttft if result.metrics is not None else None
+        self.metrics.observe(wait, time.perf_counter() - submitted_at, ttft, result.token_count)
+        if result.metrics is not None:
+            append_record(result.metrics.record(
+                mode="serve", queue_wait_s=round(wait, 4), output_chars=len(result.content), parsed=result.parsed
+            ))
+        return result
+
+    def _convert(self, text, emit, cancel):
+        cancel.check()
+        cached = self.cache.get(text) if self.cache is not None else None
+        if cached is not None:
+            if emit is not None:
+                emit("token", {"text": cached})
+            return ConversionResult(cached, True, 0, 0.0, cached=True)
+
+        if emit is None:
+            result = convert_document(text, cancel=cancel)
+        else:
+            result = self._convert_streamed(text, emit, cancel)
+        if self.cache is not None and result.cacheable:
+            self.cache.put(text, result.content)
+        return result
+
+    def _convert_streamed(self, text, emit, cancel):
+        # The tokens of a single request are forwarded as they arrive, with
+        # the envelope stripped; a chunked document is forwarded chunk by
+        # chunk, in order, like ConversionWorker does for the window
+        single = needs_single_request(plan_units(text, CHUNK_MAX_CHARS))
+        parser = EnvelopeParser()
+        tracker = ProgressTracker(estimate_output_tokens(len(text)))
+        coalescer = TokenCoalescer(lambda body: emit("token", {"text": body}))
+        lock = threading.Lock()
+
+        def on_token(token):
+            # Called from the chunk pool threads for chunked documents
+            with lock:
+                if single:
+                    coalescer.add(parser.feed(token))
+                if token:
+                    tracker.add()
+                    snapshot = tracker.report()
+                    if snapshot is not None:
+                        emit("progress", {"percent": snapshot[0], "eta_s": snapshot[1]})
+
+        def on_chunk_ready(index, result):
+            with lock:
+                coalescer.add(("\n\n" if index else "") + result.content)
+
+        try:
+            return convert_document(text, on_chunk_ready, on_token, cancel)
+        finally:
+            with lock:
+                coalescer.flush()
+
+    def snapshot(self):
+        with self._lock:
+            state = {
+                "queue_depth": self.queued,
+                "running": self.running,
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+            }
+        state.update(self.metrics.snapshot())
+        return state
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def result_payload(result):
+    payload = {
+        "markdown": result.content,
+        "parsed": result.parsed,
+        "cached": result.cached,
+        "tokens": result.token_count,
+        "elapsed_s": round(result.elapsed, 4),
+        "verification": result.verification.summary() if result.verification is not None else None,
+    }
+    if result.metrics is not None:
+        payload["metrics"] = result.metrics.record()
+    return payload
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message, headers=()):
+        self._send_json({"error": message}, status, headers)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self._send_json(self.service.snapshot())
+        elif path == "/health":
+            self._send_json({"status": "ok"})
+        else:
+            self._send_error(404, f"Unknown endpoint {path}")
+
+    def _read_text(self):
+        # Returns the input text, or None after sending an error response
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self._send_error(411, "Content-Length required")
+            return None
+        length = length.strip()
+        if not (length.isascii() and length.isdecimal()):
+            # The body cannot be delimited, so the connection cannot be reused
+            self.close_connection = True
+            self._send_error(400, f"Invalid Content-Length: {length!r}")
+            return None
+        length = int(length)
+        if length > SERVER_MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_error(413, f"Body larger than {SERVER_MAX_BODY_BYTES} bytes")
+            return None
+        body = self.rfile.read(length)
+        content_type = self.headers.get_content_type()
+        try:
+            if content_type == "application/json":
+                text = json.loads(body).get("text")
+                if not isinstance(text, str):
+                    raise ValueError('expected {"text": "..."}')
+            else:
+                text = body.decode(self.headers.get_content_charset() or "utf-8")
+        except (ValueError, LookupError, AttributeError) as e:
+            self._send_error(400, f"Invalid request body: {e}")
+            return None
+        if not text.strip():
+            self._send_error(400, "Empty input")
+            return None
+        return text
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ("/convert", "/convert/stream"):
+            self._send_error(404, f"Unknown endpoint {url.path}")
+            return
+        text = self._read_text()
+        if text is None:
+            return
+        stream = url.path == "/convert/stream" or "text/event-stream" in self.headers.get("Accept", "") or \
+            parse_qs(url.query).get("stream", ["0"])[0] not in ("0", "false", "")
+        if stream:
+            self._convert_streamed(text)
+            return
+
+        try:
+            future = self.service.submit(text)
+        except ServiceBusy as e:
+            self._send_error(429, str(e), [("Retry-After", str(e.retry_after))])
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self._send_error(502, describe_error(e))
+            return
+        self._send_json(result_payload(result))
+
+    def _convert_streamed(self, text):
+        events = queue.Queue()
+        cancel = CancelToken()
+        try:
+            future = self.service.submit(text, lambda event, data: events.put((event, data)), cancel)
+        except ServiceBusy as e:
+            self._send_error(429, str(e), [("Retry-After", str(e.retry_after))])
+            return
+        future.add_done_callback(lambda future: events.put(None))
+
+        # No length known up front: the stream ends when the connection closes
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            self.wfile.flush()
+            while True:
+                try:
+                    item = events.get(timeout=SERVER_KEEPALIVE_S)
+                except queue.Empty:
+                    self.wfile.write(b": keep-alive\n\n")
+                    self.wfile.flush()
+                    continue
+                if item is None:
+                    break
+                self._write_event(*item)
+            self._write_outcome(future)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away: stop its conversion, queued or running
+            future.cancel()
+            cancel.cancel()
+
+    def _write_event(self, event, data):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _write_outcome(self, future):
+        try:
+            result = future.result()
+        except ConversionCancelled:
+            self._write_event("error", {"error": "Conversion cancelled"})
+            return
+        except Exception as e:
+            self._write_event("error", {"error": describe_error(e)})
+            return
+        self._write_event("done", result_payload(result))
+
+
+def make_server(host=SERVER_HOST, port=SERVER_PORT, service=None):
+    service = service or ConversionService()
+    handler = type("Handler", (ConversionRequestHandler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    return httpd, service
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="File2MD serve", description="Serve text-to-markdown conversion over HTTP.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("-j", "--workers", type=int, default=SERVER_WORKERS, help="Conversions run concurrently")
+    parser.add_argument("--queue", type=int, default=SERVER_QUEUE_LIMIT,
+                        help="Conversions allowed to wait for a worker before requests get 429")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the conversion cache")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.workers, args.queue, use_cache=not args.no_cache)
+    try:
+        httpd, _ = make_server(args.host, args.port, service)
+    except OSError as e:
+        print(f"Cannot listen on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+    host, port = httpd.server_address[:2]
+    print(f"File2MD serving on http://{host}:{port} ({service.workers} workers, queue {service.queue_limit})",
+          file=sys.stderr)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopping...", file=sys.stderr)
+    finally:
+        httpd.server_close()
+        service.shutdown()
+    return 0
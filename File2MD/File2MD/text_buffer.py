@@ -0,0 +1,33 @@
+# ==============================================================================
+# 11. APPEND-EFFICIENT TEXT BUFFER
+# ==============================================================================
+
+class TextBuffer:
+    # Chunk list with O(1) append and length; getvalue() joins once and
+    # keeps the result so repeated reads are free.
+    def __init__(self, text=""):
+        self._chunks = [text] if text else []
+        self._length = len(text)
+
+    def append(self, text):
+        if text:
+            self._chunks.append(text)
+            self._length += len(text)
+
+    def __len__(self):
+        return self._length
+
+    def __bool__(self):
+        return self._length > 0
+
+    def getvalue(self):
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def clear(self):
+        self._chunks = []
+        self._length = 0
+
+    def __str__(self):
+        return self.getvalue()
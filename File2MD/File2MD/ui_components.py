@@ -1,5 +1,11 @@
-from PySide6.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton
-from PySide6.QtCore import Qt
+from PySide6.QtWidgets import (
+    QWidget, QHBoxLayout, QVBoxLayout, QLabel, QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+    QAbstractItemView, QFileDialog, QAbstractScrollArea
+)
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QPainter, QColor, QFontDatabase
+
+from job_queue import RUNNING
 
 # ==============================================================================
 # 4. UI IMPLEMENTATION (Components)
@@ -53,4 +59,191 @@ class CustomTitleBar(QWidget):
                 self.parent_window.start_pos = event.globalPosition().toPoint()
     
     def mouseReleaseEvent(self, event):
-        self.parent_window.start_pos = None
\ No newline at end of file
+        self.parent_window.start_pos = None
+
+
+def _format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024 or unit == "MB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _format_seconds(seconds):
+    return f"{seconds:.1f}s" if seconds is not None else ""
+
+
+class JobQueuePanel(QWidget):
+    # Table of queued documents; files can be dropped onto it. The panel only
+    # displays jobs and reports user actions, MainWindow owns the scheduler.
+    files_added = Signal(list)
+    job_activated = Signal(int)
+    prioritize_requested = Signal(list)
+    remove_requested = Signal(list)
+    clear_finished_requested = Signal()
+    save_all_requested = Signal()
+
+    COLUMNS = ("File", "Size", "Status", "Wait", "Time")
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAcceptDrops(True)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 6, 0, 0)
+        layout.setSpacing(4)
+
+        header = QLabel("Queue")
+        header.setProperty("class", "SectionHeader")
+        layout.addWidget(header)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setObjectName("JobTable")
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for column in range(1, len(self.COLUMNS)):
+            self.table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.cellDoubleClicked.connect(lambda row, column: self.job_activated.emit(self._job_id(row)))
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        buttons.setSpacing(6)
+        for text, handler in (
+            ("Add Files", self._choose_files),
+            ("Prioritize", lambda: self.prioritize_requested.emit(self.selected_job_ids())),
+            ("Remove", lambda: self.remove_requested.emit(self.selected_job_ids())),
+            ("Clear Finished", self.clear_finished_requested.emit),
+            ("Save All", self.save_all_requested.emit),
+        ):
+            button = QPushButton(text)
+            button.setProperty("class", "SecondaryButton")
+            button.clicked.connect(handler)
+            buttons.addWidget(button)
+        buttons.addStretch()
+        layout.addLayout(buttons)
+
+    def _choose_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Add Files to Queue", "", "Text Files (*.txt);;All Files (*)")
+        if paths:
+            self.files_added.emit(paths)
+
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        if paths:
+            self.files_added.emit(paths)
+            event.acceptProposedAction()
+
+    def _job_id(self, row):
+        return self.table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+
+    def _row_of(self, job_id):
+        for row in range(self.table.rowCount()):
+            if self._job_id(row) == job_id:
+                return row
+        return None
+
+    def selected_job_ids(self):
+        rows = sorted({index.row() for index in self.table.selectionModel().selectedRows()})
+        return [self._job_id(row) for row in rows]
+
+    def add_job(self, job):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        name_item = QTableWidgetItem(job.name)
+        name_item.setData(Qt.ItemDataRole.UserRole, job.id)
+        name_item.setToolTip(job.path)
+        self.table.setItem(row, 0, name_item)
+        for column in range(1, len(self.COLUMNS)):
+            self.table.setItem(row, column, QTableWidgetItem())
+        self.update_job(job)
+
+    def update_job(self, job):
+        row = self._row_of(job.id)
+        if row is None:
+            return
+        status = f"{job.status} {job.progress}%" if job.status == RUNNING else job.status
+        if job.priority > 0 and not job.finished:
+            status += " (priority)"
+        values = (_format_size(job.size), status, _format_seconds(job.wait_time), _format_seconds(job.run_time))
+        for column, value in enumerate(values, start=1):
+            self.table.item(row, column).setText(value)
+        self.table.item(row, 2).setToolTip(job.error)
+
+    def remove_jobs(self, job_ids):
+        for job_id in job_ids:
+            row = self._row_of(job_id)
+            if row is not None:
+                self.table.removeRow(row)
+
+
+class LargeTextView(QAbstractScrollArea):
+    # Read-only view of a MappedTextFile that only decodes and paints the
+    # lines currently visible, so the file size does not matter
+    PADDING = 8
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setObjectName("LargeTextView")
+        self.document = None
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+        self._widest_line = 0
+
+    def set_document(self, document):
+        self.document = document
+        self._widest_line = 0
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self._update_scrollbars()
+        self.viewport().update()
+
+    def _visible_line_count(self):
+        return max(1, (self.viewport().height() - self.PADDING) // self.fontMetrics().lineSpacing())
+
+    def _update_scrollbars(self):
+        visible = self._visible_line_count()
+        total = self.document.line_count if self.document is not None else 0
+        bar = self.verticalScrollBar()
+        bar.setRange(0, max(0, total - visible))
+        bar.setPageStep(visible)
+        bar.setSingleStep(1)
+        horizontal = self.horizontalScrollBar()
+        horizontal.setRange(0, max(0, self._widest_line + 2 * self.PADDING - self.viewport().width()))
+        horizontal.setPageStep(self.viewport().width())
+        horizontal.setSingleStep(self.fontMetrics().horizontalAdvance("m") * 4)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._update_scrollbars()
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor("#252526"))
+        if self.document is None:
+            return
+        painter.setPen(QColor("#d4d4d4"))
+        metrics = self.fontMetrics()
+        line_height = metrics.lineSpacing()
+        x = self.PADDING - self.horizontalScrollBar().value()
+        y = self.PADDING + metrics.ascent()
+        widest = self._widest_line
+        for line in self.document.lines(self.verticalScrollBar().value(), self._visible_line_count() + 1):
+            line = line.expandtabs(4)
+            painter.drawText(x, y, line)
+            widest = max(widest, metrics.horizontalAdvance(line))
+            y += line_height
+        painter.end()
+        if widest != self._widest_line:
+            # The horizontal range grows with the widest line seen so far
+            self._widest_line = widest
+            self._update_scrollbars()
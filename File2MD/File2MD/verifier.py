@@ -0,0 +1,248 @@
+import bisect
+import re
+import string
+
+from config import VERIFY_LOOKAHEAD_WORDS
+from chunking import split_paragraphs
+
+# ==============================================================================
+# 21. CONTENT-PRESERVATION VERIFIER
+# ==============================================================================
+
+# Markdown syntax is ASCII punctuation: one bytes.translate pass turns it
+# (and all other ASCII punctuation) into spaces and lowercases ASCII
+# letters, and bytes.split() does the rest, much faster than a regex
+_SEPARATORS = bytes(range(33, 48)) + bytes(range(58, 65)) + bytes(range(91, 97)) + bytes(range(123, 127))
+WORD_TABLE = bytes.maketrans(
+    _SEPARATORS + string.ascii_uppercase.encode(), b" " * len(_SEPARATORS) + string.ascii_lowercase.encode()
+)
+# Typographic marks the model may swap for ASCII ones (or back)
+TYPOGRAPHIC_MARKS = tuple(mark.encode('utf-8') for mark in "\u201c\u201d\u2018\u2019\u2013\u2014\u2026\u2022\u00ab\u00bb\u00a0")
+# Fence lines lose their info string ("```python"): the model may add one
+FENCE_LINE_PATTERN = re.compile(r"^[ \t]*(```|~~~).*$", re.MULTILINE)
+
+
+def extract_words(text):
+    if "```" in text or "~~~" in text:
+        text = FENCE_LINE_PATTERN.sub("", text)
+    data = text.encode('utf-8')
+    for mark in TYPOGRAPHIC_MARKS:
+        if mark in data:
+            data = data.replace(mark, b" ")
+    return data.translate(WORD_TABLE).split()
+
+
+def _find_anchor(words, anchor, start, stop):
+    # First index in [start, stop) where `anchor` (a few words) begins
+    first = anchor[0]
+    size = len(anchor)
+    while True:
+        try:
+            start = words.index(first, start, stop)
+        except ValueError:
+            return None
+        if words[start:start + size] == anchor:
+            return start
+        start += 1
+
+
+def _align(source, output, lookahead):
+    # Greedy alignment, linear when the sequences mostly agree: identical
+    # stretches are skipped a block at a time. After a mismatch it looks
+    # `lookahead` words ahead on both sides for the other side's next word,
+    # then 16 times as far for a three-word anchor (a dropped or invented
+    # paragraph). Returns (matched, dropped, extra): matched maps each
+    # output word to its source index (or -1), dropped and extra are the
+    # unmatched source and output indices.
+    matched = [-1] * len(output)
+    dropped = []
+    extra = []
+    i = j = 0
+    n, m = len(source), len(output)
+    block = 256
+    far = lookahead * 16
+    while i < n and j < m:
+        if source[i] == output[j]:
+            step = block if source[i:i + block] == output[j:j + block] else 1
+            step = min(step, n - i, m - j)
+            matched[j:j + step] = range(i, i + step)
+            i += step
+            j += step
+            continue
+        skip_source = _find_anchor(source, output[j:j + 1], i + 1, min(n, i + lookahead))
+        skip_output = _find_anchor(output, source[i:i + 1], j + 1, min(m, j + lookahead))
+        if skip_source is None and skip_output is None:
+            skip_source = _find_anchor(source, output[j:j + 3], i + 1, min(n, i + far))
+            skip_output = _find_anchor(output, source[i:i + 3], j + 1, min(m, j + far))
+        if skip_source is not None and (skip_output is None or skip_source - i <= skip_output - j):
+            dropped.extend(range(i, skip_source))
+            i = skip_source
+        elif skip_output is not None:
+            extra.extend(range(j, skip_output))
+            j = skip_output
+        else:
+            # Substitution
+            dropped.append(i)
+            extra.append(j)
+            i += 1
+            j += 1
+        if len(dropped) + len(extra) > (n + m) // 2:
+            # Mostly unrelated text: no point aligning the rest
+            break
+    dropped.extend(range(i, n))
+    extra.extend(range(j, m))
+    return matched, dropped, extra
+
+
+class Verification:
+    # Result of comparing a conversion's words with its input. `segments`
+    # are (first paragraph, last paragraph, first block, last block) ranges,
+    # inclusive, pairing source paragraphs with the output blocks that hold
+    # their words; only segments with a mismatch are listed.
+    def __init__(self, word_count, dropped=0, extra=0, paragraphs=None, blocks=None, segments=()):
+        self.word_count = word_count
+        self.dropped = dropped
+        self.extra = extra
+        self.paragraphs = paragraphs or []
+        self.blocks = blocks or []
+        self.segments = list(segments)
+        # Segments re-requested by verify_and_repair
+        self.retried = 0
+
+    @property
+    def ok(self):
+        return not self.dropped and not self.extra
+
+    @property
+    def mismatches(self):
+        return self.dropped + self.extra
+
+    def segment_sources(self):
+        return ["\n\n".join(self.paragraphs[first:last + 1]) for first, last, _, _ in self.segments]
+
+    def repaired(self, contents):
+        # The output with each failing segment's blocks replaced, in order
+        blocks = list(self.blocks)
+        for (_, _, first_block, last_block), content in reversed(list(zip(self.segments, contents))):
+            blocks[first_block:last_block + 1] = [content]
+        return "\n\n".join(block for block in blocks if block)
+
+    def summary(self):
+        return {
+            "words": self.word_count,
+            "dropped": self.dropped,
+            "extra": self.extra,
+            "failing_segments": len(self.segments),
+            "retried_segments": self.retried,
+        }
+
+    def describe(self):
+        if self.ok:
+            note = f"all {self.word_count:,} words preserved"
+            return note + (f" after re-requesting {self.retried} segment(s)" if self.retried else "")
+        note = f"{self.dropped:,} word(s) missing, {self.extra:,} added in {len(self.segments)} segment(s)"
+        return note + (f" after re-requesting {self.retried}" if self.retried else "")
+
+
+def _words_by_part(parts):
+    # One extraction for all parts: a NUL word marks each boundary. Returns
+    # the flat word list and the index of each part's first word.
+    words = extract_words(" \x00 ".join(parts))
+    flat = []
+    starts = []
+    start = 0
+    for _ in parts:
+        try:
+            end = words.index(b"\x00", start)
+        except ValueError:
+            end = len(words)
+        starts.append(len(flat))
+        flat.extend(words[start:end])
+        start = end + 1
+    return flat, starts
+
+
+def _groups(paragraph_starts, block_starts, matched, dropped, extra, output_count):
+    # Groups partition both sides in order: a group is a run of output
+    # blocks plus the source paragraphs their words came from. Paragraphs
+    # that were dropped entirely join the next group; blocks without a
+    # single source word join the current one.
+    def paragraph_of(word):
+        return bisect.bisect_right(paragraph_starts, word) - 1
+
+    groups = []  # [last paragraph, first block, last block]
+    for block, first_word in enumerate(block_starts):
+        end_word = block_starts[block + 1] if block + 1 < len(block_starts) else output_count
+        # Alignment is monotonic: the first and last matched words bound it
+        first = next((matched[k] for k in range(first_word, end_word) if matched[k] >= 0), -1)
+        last = next((matched[k] for k in range(end_word - 1, first_word - 1, -1) if matched[k] >= 0), -1)
+        low = paragraph_of(first) if first >= 0 else None
+        high = paragraph_of(last) if last >= 0 else None
+        if groups and (low is None or low <= groups[-1][0] or groups[-1][0] < 0):
+            group = groups[-1]
+            if high is not None:
+                group[0] = max(group[0], high)
+            group[2] = block
+        else:
+            groups.append([high if high is not None else -1, block, block])
+    if not groups:
+        groups.append([len(paragraph_starts) - 1, 0, -1])
+    groups[-1][0] = len(paragraph_starts) - 1
+
+    failing_paragraphs = sorted({paragraph_of(index) for index in dropped})
+    failing_blocks = sorted({bisect.bisect_right(block_starts, index) - 1 for index in extra})
+
+    def any_between(values, low, high):
+        position = bisect.bisect_left(values, low)
+        return position < len(values) and values[position] <= high
+
+    result = []
+    first_paragraph = 0
+    for last_paragraph, first_block, last_block in groups:
+        failing = any_between(failing_blocks, first_block, last_block) or \
+            any_between(failing_paragraphs, first_paragraph, last_paragraph)
+        result.append((first_paragraph, last_paragraph, first_block, last_block, failing))
+        first_paragraph = last_paragraph + 1
+    return result
+
+
+def _failing_segments(groups):
+    # Adjacent failing groups are re-requested together
+    segments = []
+    for first_paragraph, last_paragraph, first_block, last_block, failing in groups:
+        if not failing:
+            continue
+        if segments and segments[-1][1] == first_paragraph - 1 and segments[-1][3] == first_block - 1:
+            segments[-1] = (segments[-1][0], last_paragraph, segments[-1][2], last_block)
+        else:
+            segments.append((first_paragraph, last_paragraph, first_block, last_block))
+    return segments
+
+
+def align(source, output, lookahead=VERIFY_LOOKAHEAD_WORDS):
+    # Pairs source paragraphs with the output blocks holding their words.
+    # Returns (paragraphs, blocks, groups, dropped, extra); groups are
+    # (first paragraph, last paragraph, first block, last block, failing)
+    # and partition both sides in order.
+    paragraphs = split_paragraphs(source)
+    blocks = split_paragraphs(output)
+    source_words, paragraph_starts = _words_by_part(paragraphs)
+    output_words, block_starts = _words_by_part(blocks)
+    if not paragraphs:
+        return paragraphs, blocks, [], 0, len(output_words)
+    matched, dropped, extra = _align(source_words, output_words, lookahead)
+    groups = _groups(paragraph_starts, block_starts, matched, dropped, extra, len(output_words))
+    return paragraphs, blocks, groups, len(dropped), len(extra)
+
+
+def verify(source, output, lookahead=VERIFY_LOOKAHEAD_WORDS):
+    # The common case costs one word extraction per side and one list
+    # comparison; only a mismatch pays for splitting into paragraphs and a
+    # single alignment pass that localizes it
+    source_words = extract_words(source)
+    if source_words == extract_words(output):
+        return Verification(len(source_words))
+
+    paragraphs, blocks, groups, dropped, extra = align(source, output, lookahead)
+    word_count = len(source_words)
+    return Verification(word_count, dropped, extra, paragraphs, blocks, _failing_segments(groups))
@@ -0,0 +1,339 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import (
+    BATCH_EXTENSIONS, BATCH_DEFAULT_JOBS, WATCH_POLL_INTERVAL_S, WATCH_SETTLE_S, WATCH_RESCAN_INTERVAL_S,
+    WATCH_STATE_PATH, WATCH_IGNORE_PATTERNS
+)
+from converter import convert_document, describe_error, CancelToken, ConversionCancelled
+from batch import read_input, write_output, output_path_for
+from cache import get_cache
+from metrics import append_record, format_summary
+
+# ==============================================================================
+# 17. WATCH-FOLDER DAEMON (python -m File2MD watch ...)
+# ==============================================================================
+
+def is_candidate(path, extensions=BATCH_EXTENSIONS):
+    # Editors and downloaders write to temporary names and rename when done
+    name = os.path.basename(path).lower()
+    if name.startswith((".", "~")) or name.endswith(WATCH_IGNORE_PATTERNS):
+        return False
+    return name.endswith(extensions)
+
+
+def scan_tree(root):
+    files = []
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file():
+                files.append(entry.path)
+    return files
+
+
+class DirectoryPoller:
+    # Change detection without OS events. Creating, deleting or renaming a
+    # file updates its directory's mtime, so each cycle only stats the known
+    # directories and lists the ones that changed. In-place rewrites of an
+    # existing file do not touch the directory and are picked up by the
+    # watcher's periodic full rescan instead.
+    def __init__(self, roots):
+        self.roots = roots
+        self._dir_mtimes = {}
+
+    def _list(self, directory, changed):
+        try:
+            self._dir_mtimes[directory] = os.stat(directory).st_mtime_ns
+            entries = list(os.scandir(directory))
+        except OSError:
+            self._dir_mtimes.pop(directory, None)
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in self._dir_mtimes:
+                    self._list(entry.path, changed)
+            elif entry.is_file():
+                changed.add(entry.path)
+
+    def changed_files(self):
+        changed = set()
+        for root in self.roots:
+            if root not in self._dir_mtimes:
+                self._list(root, changed)
+        for directory, known_mtime in list(self._dir_mtimes.items()):
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                del self._dir_mtimes[directory]
+                continue
+            if mtime != known_mtime:
+                self._list(directory, changed)
+        return changed
+
+    def stop(self):
+        pass
+
+
+class WatchdogSource:
+    # OS file-system events through the optional `watchdog` package
+    def __init__(self, roots):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self._changed = set()
+        self._lock = threading.Lock()
+        source = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                path = getattr(event, "dest_path", None) or event.src_path
+                with source._lock:
+                    source._changed.add(path)
+
+        self._observer = Observer()
+        for root in roots:
+            self._observer.schedule(Handler(), root, recursive=True)
+        self._observer.start()
+        # Files already present when the watch starts
+        for root in roots:
+            self._changed.update(scan_tree(root))
+
+    def changed_files(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+        return changed
+
+    def stop(self):
+        self._observer.stop()
+        self._observer.join(timeout=2)
+
+
+def make_change_source(roots, use_events=True):
+    if use_events:
+        try:
+            return WatchdogSource(roots)
+        except ImportError:
+            pass
+    return DirectoryPoller(roots)
+
+
+def load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+class FolderWatcher:
+    # Files seen by the change source wait in `pending` until their size and
+    # mtime have not changed for `settle` seconds, so partially written files
+    # are never read. Only pending files are stat'ed on each cycle. The state
+    # file records each source's content hash and size/mtime when it was last
+    # converted; unchanged content is skipped.
+    def __init__(self, roots, output_dir=None, jobs=BATCH_DEFAULT_JOBS, settle=WATCH_SETTLE_S,
+                 interval=WATCH_POLL_INTERVAL_S, rescan_interval=WATCH_RESCAN_INTERVAL_S,
+                 state_path=WATCH_STATE_PATH, use_cache=True, use_events=True, log=sys.stderr):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.output_dir = output_dir
+        self.jobs = max(1, jobs)
+        self.settle = settle
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+        self.state_path = state_path
+        self.state = load_state(state_path)
+        self.cache = get_cache() if use_cache else None
+        self.log = log
+        self.cancel = CancelToken()
+        self.source = make_change_source(self.roots, use_events)
+
+        self.pending = {}
+        self.ready = deque()
+        self.in_flight = {}
+        self.converted = 0
+        self.skipped = 0
+        self.failed = 0
+        self._state_dirty = False
+        self._last_state_save = time.monotonic()
+        self._last_rescan = time.monotonic()
+
+    def output_path(self, source):
+        if self.output_dir is None:
+            return os.path.splitext(source)[0] + ".md"
+        # Mirror tree: the path relative to the watched root it lives under,
+        # plus the root's own name when several roots share the output
+        root = max((root for root in self.roots if source.startswith(root + os.sep)), key=len)
+        name = os.path.relpath(source, root)
+        if len(self.roots) > 1:
+            name = os.path.join(os.path.basename(root), name)
+        return output_path_for(name, self.output_dir)
+
+    def collect_ready(self):
+        now = time.monotonic()
+        changed = self.source.changed_files()
+        if self.rescan_interval > 0 and now - self._last_rescan >= self.rescan_interval:
+            self._last_rescan = now
+            for root in self.roots:
+                changed.update(scan_tree(root))
+
+        for path in changed:
+            if is_candidate(path) and path not in self.in_flight and path not in self.pending:
+                self.pending[path] = None
+
+        for path, seen in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            signature = [stat.st_size, stat.st_mtime_ns]
+            if seen is None and self.state.get(path, {}).get("signature") == signature:
+                # Listed again (e.g. its directory changed) but not modified
+                del self.pending[path]
+            elif seen is None or seen[0] != signature:
+                self.pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle:
+                del self.pending[path]
+                self.ready.append(path)
+
+    def convert_one(self, source):
+        # Runs on the pool; returns (state entry, result), with result None
+        # when the content is unchanged since the last conversion
+        stat = os.stat(source)
+        text = read_input(source)
+        entry = {
+            "sha256": hashlib.sha256(text.encode('utf-8')).hexdigest(),
+            "signature": [stat.st_size, stat.st_mtime_ns],
+        }
+        output = self.output_path(source)
+        if self.state.get(source, {}).get("sha256") == entry["sha256"] and os.path.exists(output):
+            return entry, None
+
+        cached = self.cache.get(text) if self.cache is not None else None
+        if cached is not None:
+            write_output(output, cached)
+            return entry, None
+        result = convert_document(text, cancel=self.cancel)
+        if self.cache is not None and result.cacheable:
+            self.cache.put(text, result.content)
+        write_output(output, result.content)
+        return entry, result
+
+    def _record(self, source, future):
+        try:
+            entry, result = future.result()
+        except ConversionCancelled:
+            return
+        except Exception as e:
+            self.failed += 1
+            print(f"[watch] FAILED {source}: {describe_error(e).splitlines()[0]}", file=self.log)
+            return
+
+        self.state[source] = entry
+        self._state_dirty = True
+        if result is None:
+            self.skipped += 1
+            return
+        self.converted += 1
+        note = "" if result.parsed else " (parsing tags failed, raw output kept)"
+        if result.metrics is not None:
+            record = result.metrics.record(
+                mode="watch", source=source, output_chars=len(result.content), parsed=result.parsed
+            )
+            append_record(record)
+            note += f" | {format_summary(record)}"
+        print(f"[watch] {source} -> {self.output_path(source)} ({result.elapsed:.1f}s){note}", file=self.log)
+
+    def _save_state(self, force=False):
+        if self._state_dirty and (force or time.monotonic() - self._last_state_save >= 5):
+            save_state(self.state_path, self.state)
+            self._state_dirty = False
+            self._last_state_save = time.monotonic()
+
+    def run(self, once=False):
+        print(f"Watching {', '.join(self.roots)} ({type(self.source).__name__})", file=self.log)
+        pool = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            while True:
+                self.collect_ready()
+                while self.ready and len(self.in_flight) < self.jobs:
+                    source = self.ready.popleft()
+                    self.in_flight[source] = pool.submit(self.convert_one, source)
+
+                if self.in_flight:
+                    done, _ = wait(list(self.in_flight.values()), timeout=self.interval, return_when=FIRST_COMPLETED)
+                    for source, future in list(self.in_flight.items()):
+                        if future in done:
+                            del self.in_flight[source]
+                            self._record(source, future)
+                elif once and not self.pending and not self.ready:
+                    break
+                else:
+                    time.sleep(self.interval if not once else min(self.interval, self.settle))
+                self._save_state()
+        except KeyboardInterrupt:
+            print("Stopping...", file=self.log)
+            self.cancel.cancel()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self.source.stop()
+            self._save_state(force=True)
+        print(f"Converted {self.converted}, unchanged {self.skipped}, failed {self.failed}", file=self.log)
+        return 1 if self.failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="File2MD watch", description="Convert text files as they appear in one or more folders."
+    )
+    parser.add_argument("folders", nargs="+", help="Directories to watch (recursively)")
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="Write outputs into a mirror tree here instead of next to each source file"
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=BATCH_DEFAULT_JOBS, help="Documents converted concurrently")
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_S,
+                        help="Seconds a file's size and mtime must stay unchanged before it is converted")
+    parser.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL_S, help="Seconds between checks")
+    parser.add_argument("--rescan", type=float, default=WATCH_RESCAN_INTERVAL_S,
+                        help="Seconds between full rescans that catch in-place rewrites (0 disables)")
+    parser.add_argument("--state", default=WATCH_STATE_PATH, help="Content-hash state file")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, bypassing the conversion cache")
+    parser.add_argument("--poll", action="store_true", help="Poll directories even if watchdog is installed")
+    parser.add_argument("--once", action="store_true", help="Convert what is there now, then exit")
+    args = parser.parse_args(argv)
+
+    missing = [folder for folder in args.folders if not os.path.isdir(folder)]
+    if missing:
+        print(f"Not a directory: {', '.join(missing)}", file=sys.stderr)
+        return 1
+
+    watcher = FolderWatcher(
+        args.folders, args.output_dir, args.jobs, args.settle, args.interval, args.rescan, args.state,
+        use_cache=not args.no_cache, use_events=not args.poll
+    )
+    return watcher.run(once=args.once)
@@ -1,7 +1,21 @@
-import ollama
+import asyncio
+import threading
+import time
+
 from PySide6.QtCore import QObject, Signal
 
-from config import MODEL_NAME, SYSTEM_PROMPT
+from config import CHUNK_MAX_CHARS, VERIFY_ENABLED
+from converter import (
+    stream_chunks, describe_error, convert_unit, convert_document, warm_up_model, TokenCoalescer, CancelToken,
+    ConversionCancelled, ConversionResult, verify_and_repair, join_chunk_contents
+)
+from envelope import EnvelopeParser, START_TAG, END_TAG
+from backends import chunk_concurrency
+from chunking import convert_chunks, convert_chunk_stream
+from fast_path import plan_units, needs_single_request, iter_units
+from metrics import StreamTimer
+from progress import ProgressTracker, estimate_output_tokens
+from file_loader import read_text
 
 # ==============================================================================
 # 3. WORKER THREAD FOR LLM COMMUNICATION
@@ -9,38 +23,353 @@ from config import MODEL_NAME, SYSTEM_PROMPT
 
 class ConversionWorker(QObject):
     new_token = Signal(str)
+    first_token = Signal(float)
+    metrics = Signal(object)
     finished = Signal()
     error = Signal(str)
-    progress = Signal(int)
+    cancelled = Signal()
+    # Percent and ETA in seconds (-1 while unknown)
+    progress = Signal(int, float)
+    # verifier.Verification and the verified (possibly repaired) output,
+    # emitted before `finished`
+    verified = Signal(object, str)
 
-    def __init__(self, text_to_convert):
+    def __init__(self, text_to_convert, source_file=None, units=None, reused_chars=0, memory=None):
         super().__init__()
         self.text_to_convert = text_to_convert
+        # A MappedTextFile in large-file mode; text_to_convert is then empty
+        self.source_file = source_file
+        # Pre-planned units from ConversionMemory.plan, with reused segments
+        # already converted; the memory is updated with the final output
+        self.units = units
+        self.reused_chars = reused_chars
+        self.memory = memory
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        # Called directly from the GUI thread: run() is blocked in the stream
+        # and would never see a queued call
+        self.cancel_token.cancel()
 
     def run(self):
+        coalescer = TokenCoalescer(self.new_token.emit)
+        timer = StreamTimer()
         try:
-            stream = ollama.generate(
-                model=MODEL_NAME,
-                prompt=self.text_to_convert,
-                system=SYSTEM_PROMPT,
-                stream=True
-            )
-
-            token_count = 0
+            if self.source_file is not None:
+                self._run_mapped(timer)
+                self.metrics.emit(timer)
+                return
+            units = self.units if self.units is not None else plan_units(self.text_to_convert, CHUNK_MAX_CHARS)
+            if not needs_single_request(units):
+                contents = self._run_chunked(timer, units)
+                if self.reused_chars:
+                    # Reused units went through the rule-based path
+                    timer.fast_path_chars = max(0, timer.fast_path_chars - self.reused_chars)
+                    timer.reused_chars = self.reused_chars
+                self._finish_output(join_chunk_contents(contents), timer)
+                self.metrics.emit(timer)
+                return
+
+            tracker = ProgressTracker(estimate_output_tokens(len(self.text_to_convert)))
+            stream = stream_chunks(self.text_to_convert, self.cancel_token)
+            raw_parts = []
+
             for chunk in stream:
+                if timer.observe(chunk):
+                    self.first_token.emit(timer.ttft)
                 token = chunk.get('response', '')
-                self.new_token.emit(token)
-                token_count += 1
-                if token_count % 10 == 0:
-                    self.progress.emit(min(90, token_count // 10))
+                coalescer.add(token)
+                raw_parts.append(token)
+                if token:
+                    tracker.add()
+                    self._report_progress(tracker)
+            if VERIFY_ENABLED or self.memory is not None:
+                # Show everything streamed so far while the output is checked
+                coalescer.flush()
+                raw = "".join(raw_parts)
+                parser = EnvelopeParser()
+                self._finish_output(parser.result(parser.feed(raw), raw)[0], timer)
+            self.metrics.emit(timer)
+
+        except ConversionCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            coalescer.flush()
+            self.error.emit(describe_error(e))
+        finally:
+            # Everything received must reach the window before `finished`
+            coalescer.flush()
+            self.progress.emit(100, 0.0)
+            self.finished.emit()
+
+    def _report_progress(self, tracker):
+        snapshot = tracker.report()
+        if snapshot is not None:
+            percent, eta = snapshot
+            self.progress.emit(percent, -1.0 if eta is None else eta)
+
+    def _finish_output(self, content, timer):
+        # Failing segments are re-requested here, on the worker thread; the
+        # window swaps in the repaired output when `finished` arrives. The
+        # memory keeps the verified output for the next, incremental run.
+        if VERIFY_ENABLED:
+            result = ConversionResult(content, True, 0, 0.0, metrics=timer)
+            verify_and_repair(self.text_to_convert, result, self.cancel_token)
+            self.verified.emit(result.verification, result.content)
+            content = result.content
+        if self.memory is not None and not self.cancel_token.cancelled:
+            self.memory.remember(self.text_to_convert, content)
+
+    def _run_chunked(self, timer, units):
+        # Units are converted concurrently; their cleaned bodies are emitted
+        # in order inside a single synthesized <markdown> envelope so the
+        # window's parsing path stays the same as for a single request.
+        # Rule-based units are ready at once and expect no model tokens.
+        estimates = [estimate_output_tokens(len(text)) if markdown is None else 0 for text, markdown in units]
+        # Counts tokens of every chunk in flight, not just the ones emitted
+        tracker = ProgressTracker(sum(estimates))
+        contents = []
+        self.new_token.emit(START_TAG + "\n")
+
+        def on_token(token):
+            # Called from the chunk pool threads
+            if token:
+                tracker.add()
+                self._report_progress(tracker)
+
+        def on_chunk_ready(index, result):
+            if index == 0:
+                self.first_token.emit(time.perf_counter() - timer.started_at)
+            timer.merge(result.metrics)
+            tracker.complete(estimates[index], result.token_count)
+            contents.append(result.content)
+            separator = "\n\n" if index < len(units) - 1 else "\n"
+            self.new_token.emit(result.content + separator)
+
+        convert_chunks(
+            units, lambda unit: convert_unit(unit, on_token, self.cancel_token), chunk_concurrency(), on_chunk_ready
+        )
+        self.new_token.emit(END_TAG)
+        return contents
+
+    def _run_mapped(self, timer):
+        # Same envelope as _run_chunked, but the chunks are decoded lazily
+        # from the mapped file and only a small window of them is in flight
+        tracker = ProgressTracker(estimate_output_tokens(self.source_file.size))
+        self.new_token.emit(START_TAG + "\n")
+
+        def on_token(token):
+            if token:
+                tracker.add()
+                self._report_progress(tracker)
+
+        def on_chunk_ready(index, result):
+            if index == 0:
+                self.first_token.emit(time.perf_counter() - timer.started_at)
+            timer.merge(result.metrics)
+            self.new_token.emit(("\n\n" if index else "") + result.content)
+
+        convert_chunk_stream(
+            iter_units(self.source_file.iter_chunks(CHUNK_MAX_CHARS)),
+            lambda unit: convert_unit(unit, on_token, self.cancel_token),
+            chunk_concurrency(), on_chunk_ready
+        )
+        self.new_token.emit("\n" + END_TAG)
+
+
+class JobWorker(QObject):
+    # Converts one queued file in the background; nothing is streamed to
+    # the window, only progress and the final result
+    progress = Signal(int, int)
+    succeeded = Signal(int, object)
+    failed = Signal(int, str)
+    cancelled = Signal(int)
+    finished = Signal()
+
+    def __init__(self, job_id, path, cache=None):
+        super().__init__()
+        self.job_id = job_id
+        self.path = path
+        self.cache = cache
+        self.cancel_token = CancelToken()
+
+    def cancel(self):
+        self.cancel_token.cancel()
+
+    def run(self):
+        try:
+            text, _ = read_text(self.path)
+
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is not None:
+                self.succeeded.emit(self.job_id, ConversionResult(cached, True, 0, 0.0, cached=True))
+                return
+
+            tracker = ProgressTracker(estimate_output_tokens(len(text)))
+
+            def on_token(token):
+                if token:
+                    tracker.add()
+                    snapshot = tracker.report()
+                    if snapshot is not None:
+                        self.progress.emit(self.job_id, snapshot[0])
+
+            result = convert_document(text, on_token=on_token, cancel=self.cancel_token)
+            if self.cache is not None and result.cacheable:
+                self.cache.put(text, result.content)
+            self.succeeded.emit(self.job_id, result)
+
+        except ConversionCancelled:
+            self.cancelled.emit(self.job_id)
+        except Exception as e:
+            self.failed.emit(self.job_id, describe_error(e))
+        finally:
+            self.finished.emit()
+
+
+class WarmupWorker(QObject):
+    # Loads the model (or refreshes its keep-alive) off the GUI thread
+    finished = Signal(bool, float, str)
+
+    def run(self):
+        try:
+            load_seconds = warm_up_model()
+        except Exception as e:
+            self.finished.emit(False, 0.0, describe_error(e))
+        else:
+            self.finished.emit(True, load_seconds, "")
+
+
+class AsyncConversionJob(QObject):
+    # Same signals as ConversionWorker, so MainWindow can drive either one.
+    # Emitted from the engine's loop thread and queued to the GUI thread.
+    new_token = Signal(str)
+    first_token = Signal(float)
+    metrics = Signal(object)
+    finished = Signal()
+    error = Signal(str)
+    cancelled = Signal()
+    # Percent and ETA in seconds (-1 while unknown)
+    progress = Signal(int, float)
+    verified = Signal(object, str)
+
+    def __init__(self, text_to_convert):
+        super().__init__()
+        self.text_to_convert = text_to_convert
+        self.memory = None
+        # Pre-planned units and reused characters, as for ConversionWorker
+        self.units = None
+        self.reused_chars = 0
+        self.future = None
+
+
+class AsyncEngineBridge(QObject):
+    # Runs the asyncio engine on a single background event loop shared by
+    # every job, instead of one QThread per conversion.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        from async_engine import AsyncConversionEngine
+
+        self.engine = AsyncConversionEngine()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="File2MD-asyncio", daemon=True)
+        self._thread.start()
+
+    def submit(self, text_to_convert, memory=None, units=None, reused_chars=0):
+        # The job is returned unstarted: connect its signals, then start()
+        # it, or the first signals are emitted with no receiver
+        job = AsyncConversionJob(text_to_convert)
+        job.memory = memory
+        job.units = units
+        job.reused_chars = reused_chars
+        return job
+
+    def start(self, job):
+        job.future = asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+
+    def cancel(self, job):
+        if job.future is not None:
+            job.future.cancel()
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=2)
+
+    async def _remember(self, job, result):
+        if job.memory is not None:
+            await asyncio.to_thread(job.memory.remember, job.text_to_convert, result.content)
+
+    async def _run(self, job):
+        coalescer = TokenCoalescer(job.new_token.emit)
+        started = time.perf_counter()
+        tracker = None
+
+        def count_token(token):
+            if token:
+                tracker.add()
+                snapshot = tracker.report()
+                if snapshot is not None:
+                    percent, eta = snapshot
+                    job.progress.emit(percent, -1.0 if eta is None else eta)
+
+        try:
+            units = job.units if job.units is not None else plan_units(job.text_to_convert, CHUNK_MAX_CHARS)
+            if not needs_single_request(units):
+                estimates = [estimate_output_tokens(len(text)) if markdown is None else 0 for text, markdown in units]
+                tracker = ProgressTracker(sum(estimates))
+                job.new_token.emit(START_TAG + "\n")
+
+                def on_chunk_ready(index, result):
+                    if index == 0:
+                        job.first_token.emit(time.perf_counter() - started)
+                    tracker.complete(estimates[index], result.token_count)
+                    if index < len(units) - 1:
+                        job.new_token.emit(result.content + "\n\n")
+                    else:
+                        # Close the envelope before verification starts, as
+                        # ConversionWorker does
+                        job.new_token.emit(result.content + "\n" + END_TAG)
+
+                result = await self.engine.convert_document(job.text_to_convert, on_chunk_ready, count_token, units)
+                if result.verification is not None:
+                    job.verified.emit(result.verification, result.content)
+                if job.reused_chars:
+                    # Reused units went through the rule-based path
+                    result.metrics.fast_path_chars = max(0, result.metrics.fast_path_chars - job.reused_chars)
+                    result.metrics.reused_chars = job.reused_chars
+                await self._remember(job, result)
+                job.metrics.emit(result.metrics)
+                return
+
+            tracker = ProgressTracker(estimate_output_tokens(len(job.text_to_convert)))
+            seen_first = False
+
+            def on_token(token):
+                nonlocal seen_first
+                if token and not seen_first:
+                    seen_first = True
+                    job.first_token.emit(time.perf_counter() - started)
+                coalescer.add(token)
+                count_token(token)
+
+            result = await self.engine.convert_text(job.text_to_convert, on_token)
+            if VERIFY_ENABLED:
+                # Tokens already streamed must reach the window first
+                coalescer.flush()
+                result = await self.engine.verify_and_repair(job.text_to_convert, result)
+                job.verified.emit(result.verification, result.content)
+            await self._remember(job, result)
+            job.metrics.emit(result.metrics)
 
+        except asyncio.CancelledError:
+            # Cancelling the task closes the response stream, which drops the
+            # connection and stops generation on the server
+            job.cancelled.emit()
+            raise
         except Exception as e:
-            error_message = f"{type(e).__name__}: {e}"
-            if "connection refused" in str(e).lower():
-                error_message += "\n\nCannot connect to Ollama.\nPlease ensure the Ollama application is running."
-            elif "model" in str(e).lower() and "not found" in str(e).lower():
-                error_message += f"\n\nModel '{MODEL_NAME}' not found.\nRun: ollama pull {MODEL_NAME}"
-            self.error.emit(error_message)
+            coalescer.flush()
+            job.error.emit(describe_error(e))
         finally:
-            self.progress.emit(100)
-            self.finished.emit()
\ No newline at end of file
+            coalescer.flush()
+            job.progress.emit(100, 0.0)
+            job.finished.emit()